@@ -1,7 +1,14 @@
 import base64
+import contextlib
+import hashlib
+import os
+import shelve
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 
 from langchain_core.documents import Document
-from langchain_community.document_loaders import (PyMuPDFLoader, TextLoader, CSVLoader, JSONLoader)
+from langchain_community.document_loaders import (TextLoader, CSVLoader, JSONLoader)
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
@@ -10,11 +17,39 @@ from PIL import Image
 import pytesseract
 import io
 from pathlib import Path
-from typing import List
-import pandas as pd
-import xml.etree.ElementTree as ET
+from typing import List, Optional
+import numpy as np
+import openpyxl
 import json
 import re
+import tempfile
+
+# Tesseract's OpenMP pool defaults to one thread per core; with OCR_CONCURRENCY
+# instances running at once that oversubscribes the CPU, so run each instance
+# single-threaded and get the parallelism from the pools instead. Must be set
+# before libtesseract/libgomp is loaded; an explicit value in the environment wins.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    # Optional libxml2-backed parser; falls back to the stdlib one with the same API
+    from lxml import etree as ET
+    XML_PARSE_OPTIONS = {"huge_tree": True}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    XML_PARSE_OPTIONS = {}
+
+try:
+    # Optional in-process Tesseract binding; falls back to the pytesseract CLI wrapper
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Byte translation table for is_quality_text: alphabetic ASCII maps to b"A", the space
+# and newline characters excluded from the character total map to b" ", the rest to b"X"
+_CHAR_CLASSES = bytes(
+    ord("A") if chr(i).isascii() and chr(i).isalpha() else ord(" ") if chr(i) in " \n" else ord("X")
+    for i in range(256)
+)
 
 
 def is_quality_text(text: str, min_length: int = 50, min_alpha_ratio: float = 0.6) -> bool:
@@ -36,8 +71,14 @@ def is_quality_text(text: str, min_length: int = 50, min_alpha_ratio: float = 0.
         return False
 
     # Count alphabetic characters
-    alpha_chars = sum(1 for c in cleaned if c.isalpha())
-    total_chars = len(cleaned.replace(" ", "").replace("\n", ""))
+    if cleaned.isascii():
+        # Classify every character in one C-level pass instead of a Python loop
+        classes = cleaned.encode("ascii").translate(_CHAR_CLASSES)
+        alpha_chars = classes.count(b"A")
+        total_chars = len(classes) - classes.count(b" ")
+    else:
+        alpha_chars = sum(1 for c in cleaned if c.isalpha())
+        total_chars = len(cleaned.replace(" ", "").replace("\n", ""))
 
     if total_chars == 0:
         return False
@@ -55,40 +96,406 @@ def is_quality_text(text: str, min_length: int = 50, min_alpha_ratio: float = 0.
     return True
 
 
-class MultiFormatLoader:
-    def __init__(self, directory_path: str):
-        self.directory_path = directory_path
-        self.documents: List[Document] = []
+# Number of Tesseract processes run at once when OCR'ing the images of a PDF. Loader
+# workers each get their share of the cores instead (see _init_worker), unless it is set.
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", os.cpu_count()))
 
-    def load_all(self) -> List[Document]:
-        """Load all supported file types from directory"""
+# Parsed-document caches of load_all, one per loaded directory (named by a hash of its path)
+LOADER_CACHE_DIR = os.getenv("LOADER_CACHE_DIR", os.path.expanduser("~/.cache/financehelper/loader"))
 
-        for file_path in Path(self.directory_path).rglob("*"):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
+# "tesseract" (default) or "easyocr"; EasyOCR batches all images of a PDF through one
+# CRAFT+CRNN forward pass and pays off with a GPU, but needs easyocr and torch installed
+OCR_BACKEND = os.getenv("OCR_BACKEND", "tesseract").lower()
+EASYOCR_BATCH_SIZE = 16
+EASYOCR_IMAGE_SIZE = 1024
 
-                try:
-                    if ext == ".pdf":
-                        self._load_pdf(str(file_path))
-                    elif ext == ".txt":
-                        self._load_txt(str(file_path))
-                    elif ext == ".csv":
-                        self._load_csv(str(file_path))
-                    elif ext == ".xlsx":
-                        self._load_xlsx(str(file_path))
-                    elif ext == ".xml":
-                        self._load_xml(str(file_path))
-                    elif ext in [".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"]:
-                        self._load_image(str(file_path))
-                    elif ext == ".md":
-                        self._load_md(str(file_path))
-                    elif ext == ".json":
-                        self._load_json(str(file_path))
-                except Exception as e:
-                    print(f"Error loading {file_path}: {e}")
+# Image formats (as reported by PyMuPDF's extract_image) that Tesseract reads natively
+TESSERACT_NATIVE_FORMATS = {"png", "jpeg", "jpg", "tiff", "tif", "bmp", "pnm", "pbm", "pgm", "ppm", "gif", "webp"}
+
+# Images per Tesseract invocation when OCR'ing through the CLI; larger lists risk
+# filling the output pipe, smaller ones pay the model start-up cost more often
+TESSERACT_BATCH_SIZE = 50
+
+_tls = threading.local()
+
+
+def _get_tesseract_api():
+    """Return this thread's PyTessBaseAPI, loading the language model only once per thread."""
+    api = getattr(_tls, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(lang="eng")
+        _tls.api = api
+    return api
+
+
+def _ocr_image(image: Image.Image) -> str:
+    """OCR a PIL image, in-process via tesserocr when available."""
+    if tesserocr is None:
+        return pytesseract.image_to_string(image)
+
+    api = _get_tesseract_api()
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+
+def _ocr_image_bytes(image_bytes: bytes, ext: str) -> str:
+    """OCR a single encoded image, returning an empty string on failure."""
+    try:
+        # Tesseract decodes these formats itself, so hand it the original bytes
+        # rather than decoding with PIL only for pytesseract to re-encode them
+        if tesserocr is None and ext in TESSERACT_NATIVE_FORMATS:
+            with tempfile.NamedTemporaryFile(suffix=f".{ext}", delete=False) as f:
+                f.write(image_bytes)
+            try:
+                return pytesseract.image_to_string(f.name)
+            finally:
+                os.unlink(f.name)
+
+        # Formats Tesseract can't read (e.g. JBIG2, JPX) go through PIL
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return _ocr_image(image)
+    except Exception as e:
+        print(f"Error extracting image: {e}")
+        return ""
+
+
+def _ocr_image_batch(images: List[tuple]) -> List[str]:
+    """
+    OCR (image_bytes, ext) pairs with a single Tesseract run over a list file.
+
+    Tesseract loads its model once for the whole list and separates the output
+    for each image with a form feed. Falls back to one run per image if the
+    batch fails or the output can't be split back into one text per image.
+    """
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for position, (image_bytes, ext) in enumerate(images):
+                if ext in TESSERACT_NATIVE_FORMATS:
+                    path = os.path.join(tmp_dir, f"{position}.{ext}")
+                    with open(path, "wb") as f:
+                        f.write(image_bytes)
+                else:
+                    path = os.path.join(tmp_dir, f"{position}.png")
+                    with Image.open(io.BytesIO(image_bytes)) as image:
+                        image.save(path)
+                paths.append(path)
+
+            list_path = os.path.join(tmp_dir, "images.txt")
+            with open(list_path, "w") as f:
+                f.write("\n".join(paths) + "\n")
+
+            texts = pytesseract.image_to_string(list_path).split("\x0c")
+    except Exception as e:
+        print(f"Error extracting image batch: {e}")
+        texts = []
+
+    if len(texts) == len(images) + 1 and not texts[-1].strip():
+        return texts[:-1]
+    return [_ocr_image_bytes(image_bytes, ext) for image_bytes, ext in images]
+
+
+def _xml_node(element) -> dict:
+    """Attributes and stripped text of an XML element, without its children."""
+    node = {}
+    if element.attrib:
+        # Copied because the element is cleared once it has been converted
+        node["@attributes"] = dict(element.attrib)
+    if element.text and element.text.strip():
+        node["text"] = element.text.strip()
+    return node
+
+
+def _parse_xml(file_path: str) -> tuple:
+    """
+    Stream an XML file into (root_tag, root_dict, num_children).
+
+    Each element is converted when it closes and then cleared, so the parsed
+    tree is never held in memory next to the resulting dictionary. Repeated
+    child tags are collected into lists.
+    """
+    # (tag, node) pairs of the children seen so far, one list per open element
+    stack = []
+    root_tag, root_dict = None, None
+    num_children = 0
+
+    for event, element in ET.iterparse(file_path, events=("start", "end"), **XML_PARSE_OPTIONS):
+        if event == "start":
+            stack.append([])
+            continue
+
+        node = _xml_node(element)
+        for tag, child_node in stack.pop():
+            if tag in node:
+                if not isinstance(node[tag], list):
+                    node[tag] = [node[tag]]
+                node[tag].append(child_node)
+            else:
+                node[tag] = child_node
+
+        if stack:
+            stack[-1].append((element.tag, node))
+            if len(stack) == 1:
+                num_children += 1
+            element.clear()
+            # lxml keeps cleared elements attached to their parent; drop them too
+            if hasattr(element, "getprevious"):
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        else:
+            root_tag, root_dict = element.tag, node
+
+    return root_tag, root_dict, num_children
+
+
+@lru_cache(maxsize=32)
+def _xlsx_sheet_summaries(file_path: str, mtime_ns: int) -> tuple:
+    """
+    Return (sheet_name, rows, column_names) for every sheet of a workbook.
+
+    Opens the workbook in openpyxl's read-only mode and reads only the sheet
+    dimensions and header row, instead of materializing every cell. Results
+    are memoized per (path, mtime) so re-reads of an unchanged file are free.
+    Rows exclude the header and unnamed columns are labelled like pandas does.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        summaries = []
+        for sheet_name in workbook.sheetnames:
+            worksheet = workbook[sheet_name]
+            header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+
+            max_row = worksheet.max_row
+            if max_row is None:
+                # Workbook doesn't record its dimensions, so count rows while streaming
+                max_row = sum(1 for _ in worksheet.iter_rows(values_only=True))
+
+            if max_row <= 1 and not any(value is not None for value in header):
+                summaries.append((sheet_name, 0, ()))
+                continue
+
+            num_columns = max(worksheet.max_column or 0, len(header))
+            header = tuple(header) + (None,) * (num_columns - len(header))
+            column_names = tuple(
+                f"Unnamed: {index}" if value is None else value
+                for index, value in enumerate(header)
+            )
+            summaries.append((sheet_name, max_row - 1, column_names))
+        return tuple(summaries)
+    finally:
+        workbook.close()
+
+
+@lru_cache(maxsize=1)
+def _get_easyocr_reader():
+    """Build the EasyOCR reader once per process and warm it up with a dummy batch."""
+    import easyocr
+    import torch
+
+    reader = easyocr.Reader(["en"], gpu=torch.cuda.is_available(), cudnn_benchmark=True, verbose=False)
+    reader.readtext_batched(
+        np.zeros([EASYOCR_BATCH_SIZE, EASYOCR_IMAGE_SIZE, EASYOCR_IMAGE_SIZE, 3], np.uint8),
+        n_width=EASYOCR_IMAGE_SIZE,
+        n_height=EASYOCR_IMAGE_SIZE,
+    )
+    return reader
+
+
+def _ocr_images_easyocr(images: List[tuple]) -> List[str]:
+    """OCR (image_bytes, ext) pairs with EasyOCR, one batched forward pass per EASYOCR_BATCH_SIZE images."""
+    reader = _get_easyocr_reader()
+    texts = [""] * len(images)
+
+    arrays, positions = [], []
+    for position, (image_bytes, _) in enumerate(images):
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                arrays.append(np.array(image.convert("RGB")))
+            positions.append(position)
+        except Exception as e:
+            print(f"Error extracting image: {e}")
+
+    for start in range(0, len(arrays), EASYOCR_BATCH_SIZE):
+        batch = arrays[start:start + EASYOCR_BATCH_SIZE]
+        results = reader.readtext_batched(
+            batch, n_width=EASYOCR_IMAGE_SIZE, n_height=EASYOCR_IMAGE_SIZE, detail=0
+        )
+        for position, lines in zip(positions[start:start + EASYOCR_BATCH_SIZE], results):
+            texts[position] = "\n".join(lines)
+
+    return texts
+
+
+@lru_cache(maxsize=1)
+def _get_ocr_executor() -> ThreadPoolExecutor:
+    """
+    Build the OCR thread pool once per process and reuse it for every PDF.
+
+    Its threads outlive each PDF, so their thread-local Tesseract APIs (and
+    loaded language models) are reused instead of rebuilt per file.
+    """
+    return ThreadPoolExecutor(max_workers=OCR_CONCURRENCY, thread_name_prefix="ocr")
+
+
+def _ocr_images(images: List[tuple]) -> List[str]:
+    """OCR a list of (image_bytes, ext) pairs, returning their texts in the same order."""
+    if OCR_BACKEND == "easyocr":
+        return _ocr_images_easyocr(images)
+
+    executor = _get_ocr_executor()
+    if tesserocr is not None:
+        return list(executor.map(_ocr_image_bytes, *zip(*images)))
+
+    batches = [images[start:start + TESSERACT_BATCH_SIZE] for start in range(0, len(images), TESSERACT_BATCH_SIZE)]
+    return [text for texts in executor.map(_ocr_image_batch, batches) for text in texts]
+
+
+# Default text flags minus ligature preservation: cheaper string building, and "ﬁ" comes out as "fi"
+PDF_TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".csv", ".xlsx", ".xml", ".md", ".json", *IMAGE_EXTENSIONS)
+
+
+def _init_worker(ocr_concurrency: int):
+    """
+    Keep each worker's Tesseract single-threaded and size its OCR pool to its share of the cores.
+
+    Every worker would otherwise default to one OCR thread per core, running
+    about cpu_count² Tesseract processes at once across the pool.
+    """
+    global OCR_CONCURRENCY
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    if "OCR_CONCURRENCY" not in os.environ:
+        OCR_CONCURRENCY = ocr_concurrency
+
+
+def _walk(root: str):
+    """Yield a DirEntry for every file under root, reusing the type info from the directory listing."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+
+def _load_one(file_path: str) -> tuple:
+    """Load a single file in a worker process and return its documents and whether it loaded without errors."""
+    loader = MultiFormatLoader(os.path.dirname(file_path), use_cache=False)
+    try:
+        loader._load_file(file_path)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return loader.documents, False
+    return loader.documents, not loader.failed_files
+
+
+class MultiFormatLoader:
+    def __init__(
+        self,
+        directory_path: str,
+        max_workers: int = None,
+        use_cache: bool = True,
+        cache_path: Optional[str] = None,
+    ):
+        self.directory_path = directory_path
+        self.max_workers = max_workers or os.cpu_count()
+        # Kept outside the loaded directory, which may be read-only and shouldn't collect cache files
+        if use_cache and not cache_path:
+            digest = hashlib.blake2b(os.path.abspath(directory_path).encode("utf-8"), digest_size=8).hexdigest()
+            cache_path = os.path.join(LOADER_CACHE_DIR, digest)
+        self.cache_path = cache_path if use_cache else None
+        self.documents: List[Document] = []
+        # Files whose loader hit an error and may have produced partial documents
+        self.failed_files: List[str] = []
+
+    def load_all(self, refresh: bool = False) -> List[Document]:
+        """
+        Load all supported file types from directory, parsing files in parallel.
+
+        Parsed documents are cached on disk per file along with its mtime and
+        size, so unchanged files are not re-parsed (or re-OCR'd) on the next
+        scan. Files that failed to load are not cached and are retried next
+        time, and entries for files no longer in the directory are dropped.
+        The cache lives in LOADER_CACHE_DIR, keyed by the directory's path,
+        unless cache_path is given; if it can't be opened, files are loaded
+        without it.
+        Pass refresh=True to ignore the cache and parse everything again.
+        """
+        entries = [
+            entry for entry in _walk(self.directory_path)
+            if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+        paths = [entry.path for entry in entries]
+
+        cache_store = contextlib.nullcontext({})
+        if self.cache_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+                cache_store = shelve.open(self.cache_path)
+            except Exception as e:
+                print(f"Error opening loader cache {self.cache_path}, loading without it: {e}")
+
+        with cache_store as cache:
+            loaded = {}
+            pending = []
+            for entry in entries:
+                path = entry.path
+                stat = entry.stat()
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                cached = None if refresh else cache.get(path)
+                if cached is not None and cached[0] == stamp:
+                    loaded[path] = cached[1]
+                else:
+                    pending.append((path, stamp))
+
+            if pending:
+                ocr_concurrency = max(1, (os.cpu_count() or 1) // self.max_workers)
+                with ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=_init_worker, initargs=(ocr_concurrency,)
+                ) as executor:
+                    results = executor.map(_load_one, [path for path, _ in pending], chunksize=4)
+                    for (path, stamp), (docs, ok) in zip(pending, results):
+                        if ok:
+                            cache[path] = (stamp, docs)
+                        else:
+                            self.failed_files.append(path)
+                            cache.pop(path, None)
+                        loaded[path] = docs
+
+            current = set(paths)
+            for path in [path for path in cache.keys() if path not in current]:
+                del cache[path]
+
+        for path in paths:
+            self.documents.extend(loaded[path])
 
         return self.documents
 
+    def _load_file(self, file_path: str):
+        """Dispatch a single file to the loader for its extension"""
+        ext = Path(file_path).suffix.lower()
+
+        if ext == ".pdf":
+            self._load_pdf(file_path)
+        elif ext == ".txt":
+            self._load_txt(file_path)
+        elif ext == ".csv":
+            self._load_csv(file_path)
+        elif ext == ".xlsx":
+            self._load_xlsx(file_path)
+        elif ext == ".xml":
+            self._load_xml(file_path)
+        elif ext in IMAGE_EXTENSIONS:
+            self._load_image(file_path)
+        elif ext == ".md":
+            self._load_md(file_path)
+        elif ext == ".json":
+            self._load_json(file_path)
+
     def _load_json(self, file_path: str):
         """Load json proper json structure"""
         loader = JSONLoader(file_path, jq_schema='.', text_content=False)
@@ -113,63 +520,74 @@ class MultiFormatLoader:
 
     def _load_pdf(self, file_path: str):
         """Load pdf with text and images"""
-        loader = PyMuPDFLoader(file_path)
-        docs = loader.load()
-
-        # Track which pages have sufficient text
-        pages_with_text = set()
-
-        for doc in docs:
-            doc.metadata['file_type'] = 'pdf'
-            doc.metadata['source'] = file_path
-
-            # If page has meaningful text, mark it
-            if len(doc.page_content.strip()) > 100:
-                pages_with_text.add(doc.metadata.get('page', 0))
-
-        self.documents.extend(docs)
-
-        # Only OCR images from pages that lack text (scanned pages)
-        self._extract_pdf_images(file_path, skip_pages=pages_with_text)
-
-    def _extract_pdf_images(self, file_path: str, skip_pages: set = None):
-        """Extract and OCR images only from pages lacking text (scanned pages)."""
-        if skip_pages is None:
-            skip_pages = set()
-
-        doc = fitz.open(file_path)
-
-        for page_num in range(len(doc)):
-            # Skip pages that already have text extracted
-            if page_num in skip_pages:
-                continue
-
-            page = doc[page_num]
-            image_list = page.get_images()
+        # Pages without meaningful text are treated as scanned and OCR'd
+        scanned_pages = []
+
+        with fitz.open(file_path) as pdf:
+            # Same document-level metadata PyMuPDFLoader attached, built once per file
+            base_metadata = {k: v for k, v in pdf.metadata.items() if v and isinstance(v, (str, int))}
+            base_metadata.update({
+                'file_type': 'pdf',
+                'source': file_path,
+                'file_path': file_path,
+                'total_pages': len(pdf),
+            })
+
+            for page_num, page in enumerate(pdf):
+                text = page.get_text(flags=PDF_TEXT_FLAGS)
+
+                if len(text.strip()) <= 100:
+                    scanned_pages.append(page)
+
+                self.documents.append(Document(page_content=text, metadata={**base_metadata, 'page': page_num}))
+
+            # Reuse the open document for image extraction instead of parsing the file again
+            self._extract_pdf_images(pdf, file_path, scanned_pages)
+
+    def _extract_pdf_images(self, doc, file_path: str, pages: list):
+        """Extract and OCR images from the given (scanned) pages of an open document."""
+        # Collect every candidate image first so they can be OCR'd concurrently
+        images = []
+        # Logos and watermarks repeat on every page; OCR each distinct image once
+        seen = set()
+        for page in pages:
+            page_num = page.number
+            image_list = page.get_images(full=False)
+            # Soft masks are listed alongside the images they belong to but carry no text
+            masks = {img[1] for img in image_list if img[1]}
 
             for img_index, img in enumerate(image_list):
                 try:
-                    xref = img[0]
+                    xref, _, width, height = img[:4]
+                    # Icons, rules and bullets never pass is_quality_text; skip them before decoding
+                    if xref in masks or width * height < 10_000 or width < 100 or height < 30:
+                        continue
                     base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-
-                    image = Image.open(io.BytesIO(image_bytes))
-                    text = pytesseract.image_to_string(image)
-
-                    # Only add if text passes quality check
-                    if is_quality_text(text):
-                        self.documents.append(Document(
-                            page_content=text,
-                            metadata={
-                                'file_type': 'pdf_image',
-                                'source': file_path,
-                                'page': page_num,
-                                'image_index': img_index
-                            }
-                        ))
+                    digest = hashlib.blake2b(base_image["image"], digest_size=16).digest()
+                    if digest in seen:
+                        continue
+                    seen.add(digest)
+                    images.append((page_num, img_index, base_image["image"], base_image["ext"]))
                 except Exception as e:
                     print(f"Error extracting image: {e}")
 
+        if not images:
+            return
+
+        texts = _ocr_images([(image_bytes, ext) for _, _, image_bytes, ext in images])
+
+        for (page_num, img_index, _, _), text in zip(images, texts):
+            # Only add if text passes quality check
+            if is_quality_text(text):
+                self.documents.append(Document(
+                    page_content=text,
+                    metadata={
+                        'file_type': 'pdf_image',
+                        'source': file_path,
+                        'page': page_num,
+                        'image_index': img_index
+                    }
+                ))
 
     def _load_txt(self, file_path: str):
         """Load txt with text"""
@@ -192,13 +610,11 @@ class MultiFormatLoader:
         self.documents.extend(docs)
 
     def _load_xlsx(self, file_path: str):
-        """Load Excel file with Pandas for better control"""
+        """Load Excel sheet summaries, streaming the workbook with openpyxl"""
         try:
-            excel_file = pd.ExcelFile(file_path)
-
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
+            summaries = _xlsx_sheet_summaries(file_path, os.stat(file_path).st_mtime_ns)
 
+            for sheet_name, rows, column_names in summaries:
                 text = f"Sheet: {sheet_name}\n\n"
 
                 self.documents.append(Document(
@@ -207,82 +623,47 @@ class MultiFormatLoader:
                         "file_type": "excel",
                         "source": file_path,
                         "sheet_name": sheet_name,
-                        "rows": len(df),
-                        "columns": len(df.columns),
-                        "column_names": list(df.columns)
+                        "rows": rows,
+                        "columns": len(column_names),
+                        "column_names": list(column_names)
                     }
                 ))
         except Exception as e:
             print(f"Error loading Excel {file_path}: {e}")
+            self.failed_files.append(file_path)
 
     def _load_xml(self, file_path: str):
         """Load xml files with structure preservation"""
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-
-            def xml_to_dict(element):
-                """Recursive function to convert xml to dictionary"""
-                result = {}
-
-                if element.attrib:
-                    result["@attributes"] = element.attrib
-                if element.text and element.text.strip():
-                    result["text"] = element.text.strip()
-
-                for child in element:
-                    child_data = xml_to_dict(child)
-                    if child.tag in result:
-                        if not isinstance(result[child.tag], list):
-                            result[child.tag] = [result[child.tag]]
-                        result[child.tag].append(child_data)
-                    else:
-                        result[child.tag] = child_data
-                return result
-
-            xml_dict = {root.tag: xml_to_dict(root)}
-
-            text = f"XML Root: {root.tag}\n\n"
-            text += json.dumps(xml_dict, indent=2, ensure_ascii=False)
+            root_tag, root_dict, num_children = _parse_xml(file_path)
 
-            def xml_to_text(element, level=0):
-                """Convert xml to indented text"""
+            xml_dict = {root_tag: root_dict}
 
-                indent = " " * level
-                text_parts = [f"{indent}{element.tag}"]
-
-                if element.attrib:
-                    attrs = ", ".join([f"{k}={v}" for k, v in element.attrib.items()])
-                    text_parts.append(f" ({attrs})")
-
-                if element.text and element.text.strip():
-                    text_parts.append(f": {element.text.strip()}")
-
-                result = "".join(text_parts) + "\n"
-
-                for child in element:
-                    result += xml_to_text(child, level + 1)
-                return result
+            text = f"XML Root: {root_tag}\n\n"
+            text += json.dumps(xml_dict, indent=2, ensure_ascii=False)
 
             self.documents.append(Document(
                 page_content=text,
                 metadata={
                     "file_type": "xml",
                     "source": file_path,
-                    "root_tag": root.tag,
+                    "root_tag": root_tag,
                     "structured_data": json.dumps(xml_dict),
-                    "num_children": len(list(root))
+                    "num_children": num_children
                 }
             ))
         except Exception as e:
             print(f"Error loading XML {file_path}: {e}")
+            self.failed_files.append(file_path)
 
     def _load_image(self, file_path: str):
         """Load and OCR image files"""
 
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            # Close the image once OCR is done so Pillow releases its pixel storage promptly
+            with Image.open(file_path) as image:
+                text = _ocr_image(image)
+                image_format = image.format
 
             # Only add if text passes quality check
             if is_quality_text(text):
@@ -291,11 +672,12 @@ class MultiFormatLoader:
                     metadata={
                         "file_type": "image",
                         "source": file_path,
-                        "format": image.format
+                        "format": image_format
                     }
                 ))
         except Exception as e:
             print(f"Error processing image {file_path}: {e}")
+            self.failed_files.append(file_path)
 
 
 
@@ -1,31 +1,72 @@
+import asyncio
+import json
 import os
+import secrets
 import sys
+import time
 from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.core import run_langgraph
+from backend.core import arun_langgraph, astream_langgraph
 from backend.schemas import (
+    FilterRequest,
     QueryRequest,
     QueryResponse,
     SourceDoc,
     GraphStatsResponse,
     GraphDataResponse,
 )
+from clients import warm_up_connections
+from graph.chains.grader_cache import grader_cache
 from graph_manager import GraphManager
+from langgraph_agents.semantic_cache import semantic_cache
+from retrieval import prefetch_filters, query_cache, refresh_local_cache, sources_cache
 
 gm: GraphManager = None
 
+# Metadata changes only when documents are ingested, so graph lookups are cached for this many seconds
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "60"))
+_metadata_cache: dict[str, tuple[float, Any]] = {}
+
+# Shared secret for /api/admin/* endpoints, sent as the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+async def _cached_metadata(key: str, fetch: Callable[[], Any]) -> Any:
+    """Return a cached graph lookup, refreshing it in a worker thread once it is older than the TTL."""
+    now = time.monotonic()
+    hit = _metadata_cache.get(key)
+    if hit and now - hit[0] < METADATA_CACHE_TTL:
+        return hit[1]
+
+    value = await asyncio.to_thread(fetch)
+    _metadata_cache[key] = (now, value)
+    return value
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Reject the request unless it carries the configured admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global gm
     gm = GraphManager()
     gm.connect()
+    # In the background, so startup isn't held up by the model APIs
+    warm_up = asyncio.create_task(warm_up_connections())
     yield
+    warm_up.cancel()
     gm.close()
 
 
@@ -43,53 +84,104 @@ app.add_middleware(
 @app.post("/api/query", response_model=QueryResponse)
 async def query(req: QueryRequest):
     try:
-        result = run_langgraph(
+        result = await arun_langgraph(
             query=req.query,
             owner=req.owner,
             company=req.company,
             category=req.category,
             year=req.year,
+            gm=gm,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return _to_response(result)
+
+
+@app.post("/api/query/stream")
+async def query_stream(req: QueryRequest):
+    """
+    Server-sent events: "token" events while the answer is generated, then a "done" event with the full response.
+
+    A "reset" event means the tokens streamed so far belonged to a discarded draft and should be cleared.
+    """
+    async def events():
+        try:
+            async for kind, payload in astream_langgraph(
+                query=req.query,
+                owner=req.owner,
+                company=req.company,
+                category=req.category,
+                year=req.year,
+                gm=gm,
+            ):
+                if kind == "token":
+                    yield f"data: {json.dumps({'type': 'token', 'content': payload})}\n\n"
+                elif kind == "reset":
+                    yield f"data: {json.dumps({'type': 'reset'})}\n\n"
+                else:
+                    response = _to_response(payload).model_dump()
+                    yield f"data: {json.dumps({'type': 'done', **response})}\n\n"
+        except Exception as e:
+            yield f"data: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/api/prefetch")
+async def prefetch(req: FilterRequest):
+    """Warm the graph lookups for filters the user just selected, before they send a query."""
+    prefetch_filters(owner=req.owner, company=req.company, category=req.category, year=req.year, gm=gm)
+    return {"status": "ok"}
+
+
+def _to_response(result: dict) -> QueryResponse:
     answer = str(result.get("answer", "")).strip() or "(No answer received)"
 
-    # Extract unique sources from the flat document list
-    seen = set()
-    sources = []
+    # Extract unique sources from the flat document list, keeping the first chunk per source
+    first: dict[str, str] = {}
     for doc in result.get("context", []):
         source = getattr(doc, "metadata", {}).get("source", "Unknown")
-        if source not in seen:
-            seen.add(source)
-            sources.append(SourceDoc(
-                source=source,
-                content=getattr(doc, "page_content", "")[:500],
-            ))
+        if source not in first:
+            first[source] = getattr(doc, "page_content", "")[:500]
+    sources = [SourceDoc(source=source, content=content) for source, content in first.items()]
 
     return QueryResponse(answer=answer, sources=sources)
 
 
 @app.get("/api/metadata/owners")
 async def get_owners() -> list[str]:
-    return gm.get_all_owners()
+    return await _cached_metadata("owners", gm.get_all_owners)
 
 
 @app.get("/api/metadata/companies")
 async def get_companies() -> list[str]:
-    return gm.get_all_companies()
+    return await _cached_metadata("companies", gm.get_all_companies)
 
 
 @app.get("/api/metadata/categories")
 async def get_categories() -> list[str]:
-    return gm.get_all_categories()
+    return await _cached_metadata("categories", gm.get_all_categories)
 
 
 @app.get("/api/metadata/stats", response_model=GraphStatsResponse)
 async def get_stats():
-    return gm.get_graph_stats()
+    return await _cached_metadata("stats", gm.get_graph_stats)
 
 
 @app.get("/api/graph/data", response_model=GraphDataResponse)
 async def get_graph_data():
-    return gm.get_graph_data()
\ No newline at end of file
+    return await _cached_metadata("graph_data", gm.get_graph_data)
+
+
+@app.post("/api/admin/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_cache():
+    """Drop cached metadata, retrieval results, grader verdicts and agent drafts, e.g. after re-ingesting documents."""
+    _metadata_cache.clear()
+    query_cache.invalidate()
+    sources_cache.invalidate()
+    grader_cache.invalidate()
+    if semantic_cache is not None:
+        semantic_cache.invalidate()
+    await asyncio.to_thread(refresh_local_cache)
+    return {"status": "ok"}
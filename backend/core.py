@@ -1,69 +1,23 @@
 import os
 import sys
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
-from dotenv import load_dotenv
 from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
 from langchain.messages import ToolMessage
 from langchain.tools import tool
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from clients import get_chat_anthropic, run_sync
 from graph_manager import GraphManager
+from retrieval import retrieve_with_mmr
 
-load_dotenv(override=True)
-
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
-
-vectorstore = PineconeVectorStore(index_name=os.getenv("INDEX_NAME"), embedding=embeddings)
+import bootstrap  # noqa: F401
 
 # model = init_chat_model("gpt-4.1", model_provider="openai")
 
-model = init_chat_model("claude-sonnet-4-5", model_provider="anthropic")
-
-# Retrieval settings
-SCORE_THRESHOLD = 0.75
-MMR_LAMBDA = 0.5
-
-def retrieve_with_mmr(
-    query: str,
-    k: int = 20,
-    fetch_k: int = 100,
-    owner: Optional[str] = None,
-    company: Optional[str] = None,
-    category: Optional[str] = None,
-    year: Optional[int] = None,
-) -> list:
-    """
-    Retrieve documents using MMR for diversity, with optional graph-based filtering.
-    """
-    filter_dict = None
-    if any([owner, company, category, year]):
-        with GraphManager() as gm:
-            allowed_sources = gm.query_documents(
-                owner=owner,
-                company=company,
-                category=category,
-                year=year,
-            )
-
-        if not allowed_sources:
-            return []
-
-        filter_dict = {"source": {"$in": allowed_sources}}
-
-    docs = vectorstore.max_marginal_relevance_search(
-        query,
-        k=k,
-        fetch_k=fetch_k,
-        lambda_mult=MMR_LAMBDA,
-        filter=filter_dict,
-    )
-
-    return docs
+model = get_chat_anthropic("claude-sonnet-4-5", temperature=None)
 
 
 # Store current filter context for the tool
@@ -75,8 +29,6 @@ def retrieve_context(query: str):
     """Retrieve relevant information to help answer a user's queries"""
     retrieved_data = retrieve_with_mmr(
         query,
-        k=20,
-        fetch_k=100,
         owner=_current_filters.get("owner"),
         company=_current_filters.get("company"),
         category=_current_filters.get("category"),
@@ -89,7 +41,62 @@ def retrieve_context(query: str):
 
     return serialized_data, retrieved_data
 
-def run_llm(
+
+SYSTEM_PROMPT = (
+    "You are a helpful AI assistant that answers user's questions. "
+    "You have access to a tool that retrieves relevant data. "
+    "Use the tool to find the relevant information before answering questions. "
+    "Always cite the sources you use in the answers. "
+    "If you're responding an API Spec, use a standard JSON or Swagger format only."
+    "If you are responding with any kind of chart or diagram, respond in mermaid format only. "
+    "Always wrap mermaid code in a fenced code block: ```mermaid\\n...\\n```. "
+    "Do not include any non-mermaid text inside the mermaid code block. Put explanations outside. "
+    "CRITICAL mermaid syntax rules you MUST follow: "
+    "1. Every node must have an ID and a label in brackets: A[Label] not just Label. "
+    "2. Node labels with parentheses or special characters MUST be quoted: A[\"Label (abbrev)\"]. "
+    "3. Edge labels must use pipe syntax: A -->|label text| B, NOT A -- label text --> B. "
+    "4. Each statement must be on its own line. "
+    "5. Node IDs must be single words with no spaces (use underscores). "
+    "6. Do not use colons in labels unless quoted. "
+    "Do not assume any information, only work with the context provided to you"
+    "If you cannot find the answer in the retrieved data, say so."
+)
+
+
+@lru_cache(maxsize=1)
+def get_agent():
+    """Build the agent once per process; filters reach its tool through _current_filters."""
+    return create_agent(model=model, system_prompt=SYSTEM_PROMPT, tools=[retrieve_context])
+
+
+def _prepare_agent(owner, company, category, year):
+    """Point the retrieval tool at the given filters and return the agent."""
+    global _current_filters
+    _current_filters = {
+        "owner": owner,
+        "company": company,
+        "category": category,
+        "year": year,
+    }
+
+    return get_agent()
+
+
+def _llm_result(messages) -> Dict[str, Any]:
+    """Pull the answer and the retrieved documents out of the agent's final messages."""
+    answer = messages[-1].content
+
+    context_docs = []
+
+    for message in messages:
+        if isinstance(message, ToolMessage) and hasattr(message, "artifact"):
+            if isinstance(message.artifact, list):
+                context_docs.append(message.artifact)
+
+    return {"answer": answer, "context": context_docs}
+
+
+async def arun_llm(
     query: str,
     owner: Optional[str] = None,
     company: Optional[str] = None,
@@ -111,57 +118,62 @@ def run_llm(
             - answer: The generated answer
             - context: List of retrieved documents
     """
-    global _current_filters
-    _current_filters = {
-        "owner": owner,
-        "company": company,
-        "category": category,
-        "year": year,
-    }
+    agent = _prepare_agent(owner, company, category, year)
 
-    system_prompt = (
-        "You are a helpful AI assistant that answers user's questions. "
-        "You have access to a tool that retrieves relevant data. "
-        "Use the tool to find the relevant information before answering questions. "
-        "Always cite the sources you use in the answers. "
-        "If you're responding an API Spec, use a standard JSON or Swagger format only."
-        "If you are responding with any kind of chart or diagram, respond in mermaid format only. "
-        "Always wrap mermaid code in a fenced code block: ```mermaid\\n...\\n```. "
-        "Do not include any non-mermaid text inside the mermaid code block. Put explanations outside. "
-        "CRITICAL mermaid syntax rules you MUST follow: "
-        "1. Every node must have an ID and a label in brackets: A[Label] not just Label. "
-        "2. Node labels with parentheses or special characters MUST be quoted: A[\"Label (abbrev)\"]. "
-        "3. Edge labels must use pipe syntax: A -->|label text| B, NOT A -- label text --> B. "
-        "4. Each statement must be on its own line. "
-        "5. Node IDs must be single words with no spaces (use underscores). "
-        "6. Do not use colons in labels unless quoted. "
-        "Do not assume any information, only work with the context provided to you"
-        "If you cannot find the answer in the retrieved data, say so."
-    )
+    messages = [{"role": "user", "content": query}]
 
-    agent = create_agent(model=model, system_prompt=system_prompt, tools=[retrieve_context])
+    response = await agent.ainvoke({"messages": messages})
+
+    return _llm_result(response["messages"])
+
+
+async def astream_llm(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the RAG pipeline, streaming the model's text as it is generated.
+
+    Yields ("token", text) for each chunk of text, then a final
+    ("result", {"answer": ..., "context": ...}) like arun_llm returns.
+    """
+    agent = _prepare_agent(owner, company, category, year)
 
     messages = [{"role": "user", "content": query}]
 
-    response = agent.invoke({"messages": messages})
+    final_state = {}
+    async for event in agent.astream_events({"messages": messages}, version="v2"):
+        if event["event"] == "on_chat_model_stream":
+            text = event["data"]["chunk"].text
+            if text:
+                yield "token", text
+        elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"]["output"]
 
-    answer = response["messages"][-1].content
+    yield "result", _llm_result(final_state["messages"])
 
-    context_docs = []
 
-    for message in response["messages"]:
-        if isinstance(message, ToolMessage) and hasattr(message, "artifact"):
-            if isinstance(message.artifact, list):
-                context_docs.append(message.artifact)
+def run_llm(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Synchronous wrapper around arun_llm for scripts."""
+    return run_sync(arun_llm(query, owner=owner, company=company, category=category, year=year))
 
-    return {"answer": answer, "context": context_docs}
 
-def run_langgraph(
+async def arun_langgraph(
     query: str,
     owner: Optional[str] = None,
     company: Optional[str] = None,
     category: Optional[str] = None,
     year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
 ) -> Dict[str, Any]:
     """
     Run the LangGraph RAG pipeline: Retrieve → Grade Documents → (Web Search) → Generate.
@@ -172,21 +184,22 @@ def run_langgraph(
         company: Filter to documents from this company
         category: Filter to documents in this category
         year: Filter to documents from this year
+        gm: Connected GraphManager for filter lookups (defaults to the shared one)
 
     Returns:
         Dictionary containing:
             - answer: The generated answer
             - context: List of retrieved documents
     """
-    from graph.graph import graph as langgraph_app
+    from graph.graph import get_graph
 
-    result = langgraph_app.invoke({
+    result = await get_graph().ainvoke({
         "question": query,
         "owner": owner,
         "company": company,
         "category": category,
         "year": year,
-    })
+    }, config={"configurable": {"graph_manager": gm}})
 
     return {
         "answer": result.get("generation", "(No answer received)"),
@@ -194,6 +207,66 @@ def run_langgraph(
     }
 
 
+async def astream_langgraph(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the LangGraph RAG pipeline, streaming the answer as it is generated.
+
+    Yields ("token", text) for each chunk of the answer, then a final
+    ("result", {"answer": ..., "context": ...}) like arun_langgraph returns.
+    Tokens of the speculative answer started during grading are streamed too;
+    if grading discards that answer, ("reset", None) is yielded and the tokens
+    so far should be dropped before the GENERATE node's answer streams in.
+    """
+    from graph.consts import GRADE_DOCUMENTS
+    from graph.graph import get_graph
+
+    final_state = {}
+    speculated = False
+    async for event in get_graph().astream_events({
+        "question": query,
+        "owner": owner,
+        "company": company,
+        "category": category,
+        "year": year,
+    }, config={"configurable": {"graph_manager": gm}}, version="v2"):
+        tags = event.get("tags", [])
+        if event["event"] == "on_chat_model_stream" and ("generation" in tags or "speculative_generation" in tags):
+            text = event["data"]["chunk"].text
+            if text:
+                speculated = speculated or "speculative_generation" in tags
+                yield "token", text
+        elif event["event"] == "on_chain_end" and event["name"] == GRADE_DOCUMENTS and speculated:
+            output = event["data"]["output"]
+            if not (isinstance(output, dict) and output.get("generation")):
+                speculated = False
+                yield "reset", None
+        elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+            final_state = event["data"]["output"]
+
+    yield "result", {
+        "answer": final_state.get("generation", "(No answer received)"),
+        "context": final_state.get("documents", []),
+    }
+
+
+def run_langgraph(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Synchronous wrapper around arun_langgraph for scripts and Streamlit."""
+    return run_sync(arun_langgraph(query, owner=owner, company=company, category=category, year=year))
+
+
 if __name__ == '__main__':
     # Test with owner filter
     print("=" * 70)
@@ -2,14 +2,17 @@ from pydantic import BaseModel
 from typing import Optional
 
 
-class QueryRequest(BaseModel):
-    query: str
+class FilterRequest(BaseModel):
     owner: Optional[str] = None
     company: Optional[str] = None
     category: Optional[str] = None
     year: Optional[int] = None
 
 
+class QueryRequest(FilterRequest):
+    query: str
+
+
 class SourceDoc(BaseModel):
     source: str
     content: str
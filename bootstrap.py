@@ -0,0 +1,11 @@
+"""
+Process-wide environment setup.
+
+Import this module instead of calling load_dotenv() in every module: Python
+caches the import, so .env is read and applied once per process no matter
+how many modules depend on it.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
@@ -0,0 +1,170 @@
+"""
+Shared LLM and embedding clients.
+
+Every chat model and embedder in the app should come from here so that
+concurrent calls (batched grading, parallel retrieval) reuse warm keep-alive
+connections instead of each module opening its own pool.
+"""
+
+import asyncio
+import os
+import threading
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, Optional
+from weakref import WeakKeyDictionary
+
+import anthropic
+import httpx
+from langchain_anthropic import ChatAnthropic
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from pinecone import Pinecone
+
+import bootstrap  # noqa: F401
+
+# httpx defaults to 100 connections with only 20 kept alive, which churns TLS handshakes under fan-out
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "256")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "64")),
+)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Pinecone keeps one urllib3 pool per index; size it for the retrieval fan-out rather than the CPU count
+PINECONE_POOL = int(os.getenv("PINECONE_POOL", "30"))
+
+
+@lru_cache(maxsize=1)
+def _openai_http_client() -> httpx.Client:
+    return httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+class _LoopLocalAsyncClient(httpx.AsyncClient):
+    """
+    AsyncClient that sends each request through a pool owned by the running event loop.
+
+    Model clients take one http_async_client for their lifetime, but the app
+    runs them under several loops (the API's, and asyncio.run in the sync
+    wrappers). A keep-alive connection opened on a loop that has since closed
+    fails with "Event loop is closed", so every loop gets its own pool, dropped
+    with the loop.
+    """
+
+    def __init__(self):
+        super().__init__(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        self._clients: WeakKeyDictionary = WeakKeyDictionary()
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        return client
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        return await self._client_for_loop().send(request, **kwargs)
+
+    async def aclose(self) -> None:
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+@lru_cache(maxsize=1)
+def _openai_async_http_client() -> httpx.AsyncClient:
+    return _LoopLocalAsyncClient()
+
+
+@lru_cache(maxsize=None)
+def get_chat_anthropic(model: str = "claude-sonnet-4-5", temperature: Optional[float] = 0) -> ChatAnthropic:
+    """
+    Return the shared ChatAnthropic instance for a model and temperature.
+
+    ChatAnthropic doesn't accept a custom httpx client, but every instance
+    already draws from one process-wide pool, so sharing instances is what's
+    left to do: it avoids rebuilding the SDK client per module.
+    """
+    return ChatAnthropic(model_name=model, temperature=temperature)
+
+
+@lru_cache(maxsize=None)
+def get_chat_openai(model: str = "gpt-4.1") -> ChatOpenAI:
+    """Return the shared ChatOpenAI instance for a model, on the pooled HTTP clients."""
+    return ChatOpenAI(
+        model=model,
+        http_client=_openai_http_client(),
+        http_async_client=_openai_async_http_client(),
+    )
+
+
+def get_openai_embeddings(model: str = "text-embedding-3-large", **kwargs) -> OpenAIEmbeddings:
+    """Build OpenAIEmbeddings on the pooled HTTP clients."""
+    return OpenAIEmbeddings(
+        model=model,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=_openai_http_client(),
+        http_async_client=_openai_async_http_client(),
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_pinecone_index(name: str):
+    """Return the shared Pinecone index handle for an index name, with a pool of PINECONE_POOL connections."""
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=PINECONE_POOL)
+    return pc.Index(name, connection_pool_maxsize=PINECONE_POOL)
+
+
+@lru_cache(maxsize=1)
+def _background_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="async-clients", daemon=True).start()
+    return loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from synchronous code and return its result.
+
+    Every call shares one long-lived background loop instead of starting a
+    fresh one with asyncio.run: the SDK clients cache connections bound to the
+    loop that opened them, so they break once that loop has closed.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+def iterate_sync(agen: AsyncIterator) -> Iterator:
+    """Iterate an async generator from synchronous code, on the same background loop as run_sync."""
+    loop = _background_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+async def warm_up_connections() -> None:
+    """
+    Open pooled connections to the model APIs ahead of the first query.
+
+    Each request is the cheapest one that completes a TLS handshake on the
+    pool the real calls will use; failures are reported and otherwise ignored.
+    """
+    # Error responses don't matter, only the open connection behind them
+    async def warm_anthropic():
+        try:
+            await get_chat_anthropic()._async_client.models.list(limit=1)
+        except anthropic.APIStatusError:
+            pass
+
+    async def warm_openai():
+        response = await _openai_async_http_client().get("https://api.openai.com/v1/models", timeout=5.0)
+        await response.aclose()
+
+    async def warm_pinecone():
+        await asyncio.to_thread(get_pinecone_index(os.getenv("INDEX_NAME")).describe_index_stats)
+
+    for result in await asyncio.gather(warm_anthropic(), warm_openai(), warm_pinecone(), return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"Error warming up connections: {result}")
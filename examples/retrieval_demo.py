@@ -0,0 +1,74 @@
+"""
+Example queries against the retrieval chains.
+
+Run from the repository root with: python -m examples.retrieval_demo
+"""
+
+import asyncio
+
+from retrieval import arun_many, retrieval_stream
+
+
+def main():
+    print("Retrieving documents...")
+
+    # =====================================================
+    # Example 1: Unfiltered query (searches all documents)
+    # =====================================================
+    print("\n" + "=" * 70)
+    print("Example 1: Unfiltered search")
+    print("=" * 70)
+
+    query = "What is the PAN number?"
+    print(f"\nQuery: {query}")
+    print("Answer: ", end="")
+    for token in retrieval_stream(query):
+        print(token, end="", flush=True)
+    print()
+
+    # =====================================================
+    # Example 2: Filtered to personal documents only
+    # =====================================================
+    print("\n" + "=" * 70)
+    print("Example 2: Filtered to Ved Muthal's documents only")
+    print("=" * 70)
+
+    query = "What personal information do you have?"
+    print(f"\nQuery: {query}")
+    print(f"Filter: owner='Ved Muthal'")
+    print("Answer: ", end="")
+    for token in retrieval_stream(query, owner="Ved Muthal"):
+        print(token, end="", flush=True)
+    print()
+
+    # =====================================================
+    # Example 3: Filtered to SBI documents from 2024
+    # =====================================================
+    print("\n" + "=" * 70)
+    print("Example 3: Filtered to SBI 2024 documents")
+    print("=" * 70)
+
+    query = "What was the net profit?"
+    print(f"\nQuery: {query}")
+    print(f"Filter: company='State Bank of India', year=2024")
+    print("Answer: ", end="")
+    for token in retrieval_stream(query, company="State Bank of India", year=2024):
+        print(token, end="", flush=True)
+    print()
+
+    # =====================================================
+    # Example 4: Several questions answered concurrently
+    # =====================================================
+    print("\n" + "=" * 70)
+    print("Example 4: Concurrent questions")
+    print("=" * 70)
+
+    questions = ["What is the PAN number?", "What was the net profit?"]
+    answers = asyncio.run(arun_many(questions))
+    for query, result in zip(questions, answers):
+        print(f"\nQuery: {query}")
+        print(f"Answer: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,14 @@ export async function postQuery(query, filters = {}) {
   return res.json()
 }
 
+export async function prefetchFilters(filters) {
+  await fetch('/api/prefetch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(filters)
+  })
+}
+
 export async function getOwners() {
   const res = await fetch('/api/metadata/owners')
   return res.json()
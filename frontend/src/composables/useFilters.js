@@ -1,5 +1,5 @@
-import { ref } from 'vue'
-import { getOwners, getCompanies, getCategories } from '../api/client'
+import { ref, watch } from 'vue'
+import { getOwners, getCompanies, getCategories, prefetchFilters } from '../api/client'
 
 const owners = ref([])
 const companies = ref([])
@@ -9,6 +9,21 @@ const selectedCompany = ref(null)
 const selectedCategory = ref(null)
 const selectedYear = ref(null)
 
+function activeFilters() {
+  const f = {}
+  if (selectedOwner.value) f.owner = selectedOwner.value
+  if (selectedCompany.value) f.company = selectedCompany.value
+  if (selectedCategory.value) f.category = selectedCategory.value
+  if (selectedYear.value) f.year = parseInt(selectedYear.value)
+  return f
+}
+
+// Let the backend look up the matching documents while the question is still being typed
+watch([selectedOwner, selectedCompany, selectedCategory, selectedYear], () => {
+  const f = activeFilters()
+  if (Object.keys(f).length) prefetchFilters(f).catch(() => {})
+})
+
 export function useFilters() {
   async function loadFilters() {
     const [o, co, ca] = await Promise.all([getOwners(), getCompanies(), getCategories()])
@@ -18,12 +33,7 @@ export function useFilters() {
   }
 
   function getActiveFilters() {
-    const f = {}
-    if (selectedOwner.value) f.owner = selectedOwner.value
-    if (selectedCompany.value) f.company = selectedCompany.value
-    if (selectedCategory.value) f.category = selectedCategory.value
-    if (selectedYear.value) f.year = parseInt(selectedYear.value)
-    return f
+    return activeFilters()
   }
 
   function clearFilters() {
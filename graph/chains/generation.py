@@ -1,17 +1,38 @@
-from dotenv import load_dotenv
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
+
+from functools import lru_cache
 
 from langsmith import Client
 from langchain_core.output_parsers import StrOutputParser
-from langchain_anthropic import ChatAnthropic
 
-llm = ChatAnthropic(model_name="claude-sonnet-4-5", temperature=0)
+from clients import get_chat_anthropic
+from token_utils import count_tokens, pack_documents
+
+# Claude's context window, less room for the system prompt and the answer itself
+CONTEXT_WINDOW_TOKENS = 200_000
+RESERVED_TOKENS = 16_000
+
+
+@lru_cache(maxsize=1)
+def get_generation_chain():
+    """Pull the prompt from LangSmith and build the generation chain on first use."""
+    llm = get_chat_anthropic("claude-sonnet-4-5", temperature=0)
+
+    client = Client()
 
-client = Client()
+    prompt = client.pull_prompt("searchsystemprompt")
 
-prompt = client.pull_prompt("searchsystemprompt")
+    return prompt | llm | StrOutputParser()
 
-generation_chain = prompt | llm | StrOutputParser()
 
+def generation_input(question: str, documents) -> dict:
+    """Chain input with the documents packed into what's left of the context window."""
+    budget = CONTEXT_WINDOW_TOKENS - RESERVED_TOKENS - count_tokens(question)
+    return {"question": question, "context": pack_documents(documents, budget)}
 
 
+def __getattr__(name):
+    # Keep `from graph.chains.generation import generation_chain` working
+    if name == "generation_chain":
+        return get_generation_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+# Set GRADER_SEMCACHE=1 to reuse grader verdicts for questions that are near-duplicates of earlier ones
+GRADER_SEMCACHE = os.getenv("GRADER_SEMCACHE", "0") == "1"
+
+# Cosine similarity between question embeddings above which a cached verdict is reused
+GRADER_SEMCACHE_THRESHOLD = float(os.getenv("GRADER_SEMCACHE_THRESHOLD", "0.95"))
+
+
+class GraderCache:
+    """
+    In-process semantic cache of retrieval grader verdicts.
+
+    Entries are keyed by document (source plus a hash of its content, so a
+    re-ingested document never matches a stale verdict) and hold the embeddings
+    of the questions it was graded against. A lookup reuses the verdict of the
+    most similar earlier question if it clears the threshold. Documents are
+    evicted least-recently-used, and verdicts expire after ttl seconds.
+    """
+
+    def __init__(
+        self,
+        threshold: float = GRADER_SEMCACHE_THRESHOLD,
+        max_documents: int = 10_000,
+        max_questions: int = 32,
+        ttl: float = 24 * 60 * 60,
+    ):
+        self.threshold = threshold
+        self.max_documents = max_documents
+        self.max_questions = max_questions
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def _key(document) -> tuple:
+        source = document.metadata.get("source", "")
+        digest = hashlib.blake2b(document.page_content.encode("utf-8"), digest_size=16).digest()
+        return source, digest
+
+    @staticmethod
+    def normalize(question_embedding) -> np.ndarray:
+        """Unit-normalize a question embedding so similarity is a plain dot product."""
+        vector = np.asarray(question_embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, question_vector: np.ndarray, document) -> Optional[Any]:
+        """Return the cached verdict for a similar question about this document, if any."""
+        key = self._key(document)
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        entries[:] = [entry for entry in entries if now - entry[0] < self.ttl]
+        if not entries:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        similarities = np.stack([vector for _, vector, _ in entries]) @ question_vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return entries[best][2]
+        return None
+
+    def put(self, question_vector: np.ndarray, document, verdict: Any) -> None:
+        """Remember the verdict for this question and document."""
+        key = self._key(document)
+        entries = self._entries.setdefault(key, [])
+        entries.append((time.monotonic(), question_vector, verdict))
+        del entries[:-self.max_questions]
+
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_documents:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Forget every verdict, e.g. after re-ingesting documents."""
+        self._entries.clear()
+
+
+grader_cache = GraderCache()
@@ -1,9 +1,17 @@
+import os
+from functools import lru_cache
+from typing import List, Literal, Optional
+
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 
-llm = ChatAnthropic(model_name="claude-sonnet-4-5", temperature=0)
+from clients import get_chat_anthropic
+from token_utils import trim_tokens
+
+
+def get_llm() -> ChatAnthropic:
+    return get_chat_anthropic("claude-sonnet-4-5", temperature=0)
 
 class GradeDocuments(BaseModel):
     """Binary score for relevance check on each document"""
@@ -12,8 +20,6 @@ class GradeDocuments(BaseModel):
         description="Documents are relevant to the question, 'yes' or 'no'"
     )
 
-structured_llm_grader = llm.with_structured_output(GradeDocuments)
-
 system = """You are a grader assessing the relevance of documents to a user question. \n
             You will be provided with a question and a list of documents. \n
             Your task is to determine if each document is relevant to the question. \n
@@ -26,4 +32,75 @@ grader_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-retrieval_grader = grader_prompt | structured_llm_grader
\ No newline at end of file
+
+@lru_cache(maxsize=1)
+def get_retrieval_grader():
+    """Build the single-document grader chain on first use."""
+    return grader_prompt | get_llm().with_structured_output(GradeDocuments)
+
+
+class GradeDocumentsBatch(BaseModel):
+    """Binary relevance scores for a numbered list of documents"""
+
+    binary_scores: List[Literal["yes", "no"]] = Field(
+        description="One 'yes' or 'no' per input document, in the order the documents were given"
+    )
+
+batch_grader_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", system),
+        ("human", "Retrieved documents: \n\n {documents} \n\n User question: {question}")
+    ]
+)
+
+
+@lru_cache(maxsize=1)
+def get_batch_retrieval_grader():
+    """Build the batch grader chain on first use."""
+    return batch_grader_prompt | get_llm().with_structured_output(GradeDocumentsBatch)
+
+
+def format_documents_block(documents, max_tokens: Optional[int] = None) -> str:
+    """Number documents for the batch grader prompt, trimming each to max_tokens if given."""
+    return "\n\n".join(
+        f"[{i}] {trim_tokens(document.page_content, max_tokens) if max_tokens else document.page_content}"
+        for i, document in enumerate(documents)
+    )
+
+
+# "llm" (default) grades with Claude; "cross-encoder" scores (question, document) pairs with a
+# local reranker instead, which needs sentence-transformers and its model weights installed
+GRADER_BACKEND = os.getenv("GRADER_BACKEND", "llm").lower()
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "BAAI/bge-reranker-base")
+CROSS_ENCODER_THRESHOLD = float(os.getenv("CROSS_ENCODER_THRESHOLD", "0.5"))
+
+
+@lru_cache(maxsize=1)
+def get_cross_encoder():
+    """Load the cross-encoder once per process."""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(CROSS_ENCODER_MODEL)
+
+
+def cross_encoder_grades(question: str, documents) -> List[str]:
+    """Grade all documents in one batched forward pass, 'yes' where the sigmoid score clears the threshold."""
+    scores = get_cross_encoder().predict(
+        [(question, document.page_content) for document in documents],
+        batch_size=32,
+    )
+    return ["yes" if score > CROSS_ENCODER_THRESHOLD else "no" for score in scores]
+
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "retrieval_grader": get_retrieval_grader,
+    "batch_retrieval_grader": get_batch_retrieval_grader,
+}
+
+
+def __getattr__(name):
+    # Keep `from graph.chains.retrieval_grader import retrieval_grader` working
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
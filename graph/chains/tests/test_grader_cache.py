@@ -0,0 +1,74 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from graph.chains.grader_cache import GraderCache
+
+
+def _vector(*values) -> np.ndarray:
+    return GraderCache.normalize(values)
+
+
+def test_reuses_verdict_for_similar_question() -> None:
+    cache = GraderCache(threshold=0.95)
+    document = Document(page_content="Revenue grew 10%", metadata={"source": "report.pdf"})
+
+    cache.put(_vector(1.0, 0.0), document, "yes")
+
+    assert cache.get(_vector(1.0, 0.05), document) == "yes"
+    assert cache.get(_vector(0.0, 1.0), document) is None
+
+
+def test_changed_content_misses() -> None:
+    cache = GraderCache()
+    cache.put(_vector(1.0, 0.0), Document(page_content="old", metadata={"source": "a"}), "yes")
+
+    assert cache.get(_vector(1.0, 0.0), Document(page_content="new", metadata={"source": "a"})) is None
+
+
+def test_verdicts_expire(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("graph.chains.grader_cache.time.monotonic", lambda: now[0])
+    cache = GraderCache(ttl=10)
+    document = Document(page_content="text", metadata={"source": "a"})
+
+    cache.put(_vector(1.0, 0.0), document, "no")
+    now[0] += 5
+    assert cache.get(_vector(1.0, 0.0), document) == "no"
+    now[0] += 10
+    assert cache.get(_vector(1.0, 0.0), document) is None
+
+
+def test_evicts_least_recently_used_document() -> None:
+    cache = GraderCache(max_documents=2)
+    documents = [Document(page_content=f"doc {i}", metadata={"source": "a"}) for i in range(3)]
+    question = _vector(1.0, 0.0)
+
+    cache.put(question, documents[0], "yes")
+    cache.put(question, documents[1], "yes")
+    cache.get(question, documents[0])
+    cache.put(question, documents[2], "yes")
+
+    assert cache.get(question, documents[0]) == "yes"
+    assert cache.get(question, documents[1]) is None
+    assert cache.get(question, documents[2]) == "yes"
+
+
+def test_keeps_only_latest_questions_per_document() -> None:
+    cache = GraderCache(max_questions=1)
+    document = Document(page_content="text", metadata={"source": "a"})
+
+    cache.put(_vector(1.0, 0.0), document, "yes")
+    cache.put(_vector(0.0, 1.0), document, "no")
+
+    assert cache.get(_vector(1.0, 0.0), document) is None
+    assert cache.get(_vector(0.0, 1.0), document) == "no"
+
+
+def test_invalidate_forgets_verdicts() -> None:
+    cache = GraderCache()
+    document = Document(page_content="text", metadata={"source": "a"})
+    cache.put(_vector(1.0, 0.0), document, "yes")
+
+    cache.invalidate()
+
+    assert cache.get(_vector(1.0, 0.0), document) is None
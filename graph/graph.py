@@ -1,14 +1,45 @@
-from dotenv import load_dotenv
+import os
+from functools import lru_cache
+
 from langgraph.graph import StateGraph, END
 from graph.consts import RETRIEVE, GRADE_DOCUMENTS, WEB_SEARCH, GENERATE
 from graph.nodes import *
 from graph.state import GraphState
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
+
+# Top retrieval similarity above which grading is skipped, and below which retrieval
+# is treated as a miss and the graph goes straight to web search, discarding the
+# retrieved documents. Documents without a cosine relevance_score (e.g. reranked
+# by the server-side search) are never routed on.
+ROUTE_GENERATE_SCORE = float(os.getenv("ROUTE_GENERATE_SCORE", "0.9"))
+ROUTE_WEB_SEARCH_SCORE = float(os.getenv("ROUTE_WEB_SEARCH_SCORE", "0.4"))
+
+
+def route_after_retrieve(state):
+    print("---Route Retrieved Documents---")
+
+    scores = [document.metadata["relevance_score"] for document in state["documents"]
+              if "relevance_score" in document.metadata]
+    if not scores:
+        return GRADE_DOCUMENTS
+
+    top_score = max(scores)
+    if top_score > ROUTE_GENERATE_SCORE:
+        print(f"---Decision: Top score {top_score:.2f}, skip grading.---")
+        return GENERATE
+    if top_score < ROUTE_WEB_SEARCH_SCORE:
+        print(f"---Decision: Top score {top_score:.2f}, search the web.---")
+        return WEB_SEARCH
+    return GRADE_DOCUMENTS
+
 
 def decide_to_generate(state):
     print("---Assess Graded Documents---")
 
+    if state.get("generation"):
+        print("---Decision: Speculative generation accepted.---")
+        return END
     if state["web_search"]:
         print(
             "---Decision: Not all documents are relevant.---"
@@ -18,17 +49,30 @@ def decide_to_generate(state):
         print("---Decision: Generate.---")
         return GENERATE
 
-workflow = StateGraph(GraphState)
-workflow.add_node(RETRIEVE, retrieve)
-workflow.add_node(GRADE_DOCUMENTS, grade_documents)
-workflow.add_node(WEB_SEARCH, web_search)
-workflow.add_node(GENERATE, generate)
 
-workflow.set_entry_point(RETRIEVE)
-workflow.add_edge(RETRIEVE, GRADE_DOCUMENTS)
-workflow.add_conditional_edges(GRADE_DOCUMENTS, decide_to_generate, {WEB_SEARCH: WEB_SEARCH, GENERATE: GENERATE})
-workflow.add_edge(WEB_SEARCH, GENERATE)
-workflow.add_edge(GENERATE, END)
-graph = workflow.compile()
+@lru_cache(maxsize=1)
+def get_graph():
+    """Compile the workflow once per process, on first use."""
+    workflow = StateGraph(GraphState)
+    workflow.add_node(RETRIEVE, retrieve)
+    workflow.add_node(GRADE_DOCUMENTS, grade_documents)
+    workflow.add_node(WEB_SEARCH, web_search)
+    workflow.add_node(GENERATE, generate)
+
+    workflow.set_entry_point(RETRIEVE)
+    workflow.add_conditional_edges(
+        RETRIEVE,
+        route_after_retrieve,
+        {GRADE_DOCUMENTS: GRADE_DOCUMENTS, WEB_SEARCH: WEB_SEARCH, GENERATE: GENERATE},
+    )
+    workflow.add_conditional_edges(GRADE_DOCUMENTS, decide_to_generate, {WEB_SEARCH: WEB_SEARCH, GENERATE: GENERATE, END: END})
+    workflow.add_edge(WEB_SEARCH, GENERATE)
+    workflow.add_edge(GENERATE, END)
+    return workflow.compile()
 
 
+def __getattr__(name):
+    # Keep `from graph.graph import graph` working
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,15 @@
 from typing import Any, Dict
 
-from graph.chains.generation import generation_chain
+from graph.chains.generation import generation_input, get_generation_chain
 from graph.state import GraphState
 
-def generate(state: GraphState) -> Dict[str, Any]:
+async def generate(state: GraphState) -> Dict[str, Any]:
     print("---Generate---")
     question = state['question']
     documents = state['documents']
 
-    generation = generation_chain.invoke({"question": question, "context": documents})
-    return {"documents": documents, "question": question, "generation": generation}
-
-
+    # Tagged so callers of astream_events can pick out the answer's token stream
+    generation = await get_generation_chain().with_config(tags=["generation"]).ainvoke(
+        generation_input(question, documents)
+    )
+    return {"generation": generation}
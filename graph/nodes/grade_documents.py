@@ -1,13 +1,112 @@
-from typing import Any, Dict
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
 
-from graph.chains.retrieval_grader import retrieval_grader
+from graph.chains.generation import generation_input, get_generation_chain
+from graph.chains.grader_cache import GRADER_SEMCACHE, grader_cache
+from graph.chains.retrieval_grader import (
+    GRADER_BACKEND,
+    cross_encoder_grades,
+    format_documents_block,
+    get_batch_retrieval_grader,
+    get_retrieval_grader,
+)
+from graph.nodes.web_search import prefetch_web_search
 from graph.state import GraphState
+from retrieval import aembed_query
+from token_utils import trim_tokens
 
-def grade_documents(state: GraphState) -> Dict[str, Any]:
+# Upper bound on grader calls in flight at once, to stay within Anthropic rate limits
+GRADER_MAX_CONCURRENCY = 16
+
+# Retrieval similarity at or above which a document is accepted without asking the grader,
+# and at or below which it is rejected; only the band in between goes to the LLM
+GRADER_AUTO_ACCEPT = float(os.getenv("GRADER_AUTO_ACCEPT", "0.85"))
+GRADER_AUTO_REJECT = float(os.getenv("GRADER_AUTO_REJECT", "0.55"))
+
+# Generate from the retrieved documents while they are being graded (set to 1 to enable).
+# Off by default: the speculative answer is thrown away whenever a document fails grading.
+SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "0") == "1"
+
+# Start the web search alongside grading so it is ready if any document fails (set to 0 to disable)
+WEB_SEARCH_PREFETCH = os.getenv("WEB_SEARCH_PREFETCH", "1") == "1"
+
+# The grader only needs the start of a chunk to judge relevance
+GRADER_DOCUMENT_TOKENS = 512
+
+# Documents graded per LLM call; keeps the structured output short and reliable
+GRADER_BATCH_SIZE = 10
+
+
+def _grade_by_score(document) -> Optional[str]:
+    """Grade a document from its retrieval similarity alone, or None if it is ambiguous."""
+    score = document.metadata.get("relevance_score")
+    if score is None:
+        return None
+    if score >= GRADER_AUTO_ACCEPT:
+        return "yes"
+    if score <= GRADER_AUTO_REJECT:
+        return "no"
+    return None
+
+
+async def _grade(question: str, documents: List) -> List[str]:
+    """Grade documents with the configured backend, returning 'yes'/'no' per document in order."""
+    if GRADER_BACKEND == "cross-encoder":
+        return await asyncio.to_thread(cross_encoder_grades, question, documents)
+
+    batches = [documents[start:start + GRADER_BATCH_SIZE] for start in range(0, len(documents), GRADER_BATCH_SIZE)]
+    results = await get_batch_retrieval_grader().abatch(
+        [{"question": question, "documents": format_documents_block(batch, GRADER_DOCUMENT_TOKENS)} for batch in batches],
+        config={"max_concurrency": GRADER_MAX_CONCURRENCY},
+    )
+
+    grades = []
+    for batch, result in zip(batches, results):
+        if len(result.binary_scores) == len(batch):
+            grades.extend(result.binary_scores)
+            continue
+
+        # The model lost count; grade this batch one document at a time instead
+        scores = await get_retrieval_grader().abatch(
+            [{"question": question, "document": trim_tokens(document.page_content, GRADER_DOCUMENT_TOKENS)}
+             for document in batch],
+            config={"max_concurrency": GRADER_MAX_CONCURRENCY},
+        )
+        grades.extend(score.binary_score for score in scores)
+    return grades
+
+
+async def _grade_documents(question: str, documents: List) -> List[str]:
+    """Grade by retrieval score, then the verdict cache, then the LLM for whatever is left."""
+    grades = [_grade_by_score(document) for document in documents]
+    if GRADER_SEMCACHE and None in grades:
+        question_vector = grader_cache.normalize(await aembed_query(question))
+        grades = [grade or grader_cache.get(question_vector, document) for grade, document in zip(grades, documents)]
+
+    # Send the remaining ambiguous documents to the LLM in a few concurrent batched calls
+    misses = [i for i, grade in enumerate(grades) if grade is None]
+    if misses:
+        graded = await _grade(question, [documents[i] for i in misses])
+        for i, grade in zip(misses, graded):
+            grades[i] = grade
+            if GRADER_SEMCACHE:
+                grader_cache.put(question_vector, documents[i], grade)
+    return grades
+
+
+async def grade_documents(state: GraphState) -> Dict[str, Any]:
     """
     Determines whether the retrieved documents are relevant to the user's question.
     If any question is not relevant, we will set a flag to run web search.
 
+    With SPECULATIVE_GENERATION=1, the answer is generated from the full
+    retrieved set while grading runs, unless a document's retrieval score
+    already means it will be rejected. If every document passes, that answer
+    is returned as the generation and the graph skips the GENERATE node;
+    otherwise it is cancelled. Likewise, unless WEB_SEARCH_PREFETCH=0, the
+    web search is started alongside grading and cancelled if no document fails.
+
     Args:
         state (dict): The current graph state
 
@@ -18,19 +117,46 @@ def grade_documents(state: GraphState) -> Dict[str, Any]:
     question = state["question"]
     documents = state["documents"]
 
-    filtered_documents = []
-    web_search = False
-    for document in documents:
-        score = retrieval_grader.invoke(
-            {"question": question, "document": document}
+    # A score-rejected document means web search, and the speculative answer would be discarded
+    speculative = None
+    if SPECULATIVE_GENERATION and all(_grade_by_score(document) != "no" for document in documents):
+        speculative = asyncio.create_task(
+            get_generation_chain().with_config(tags=["speculative_generation"]).ainvoke(
+                generation_input(question, documents)
+            )
         )
-        grade = score.binary_score
-        if grade.lower() == "yes":
-            print("---Grade: Document is relevant---")
-            filtered_documents.append(document)
-        else:
-            print("---Grade: Document is irrelevant---")
-            web_search = True
-            continue
 
-    return {"documents": filtered_documents, "question": question, "web_search": web_search}
\ No newline at end of file
+    prefetch = prefetch_web_search(question) if WEB_SEARCH_PREFETCH else None
+
+    web_search = False
+    try:
+        grades = await _grade_documents(question, documents)
+
+        filtered_documents = []
+        for document, grade in zip(documents, grades):
+            if grade.lower() == "yes":
+                print("---Grade: Document is relevant---")
+                filtered_documents.append(document)
+            else:
+                print("---Grade: Document is irrelevant---")
+                web_search = True
+                continue
+
+        result = {
+            "documents": filtered_documents,
+            "web_search": web_search,
+            "web_search_prefetch": prefetch if web_search else None,
+        }
+
+        # Nothing was filtered out, so the speculative answer used exactly the final context
+        if speculative is not None and not web_search:
+            try:
+                result["generation"] = await speculative
+            except Exception as e:
+                print(f"Error in speculative generation: {e}")
+        return result
+    finally:
+        if speculative is not None and not speculative.done():
+            speculative.cancel()
+        if prefetch is not None and not web_search:
+            prefetch.cancel()
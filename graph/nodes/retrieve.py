@@ -1,18 +1,20 @@
 from typing import Any, Dict
 
+from langchain_core.runnables import RunnableConfig
 
 from graph.state import GraphState
-from retrieval import retrieve_with_mmr
+from retrieval import aretrieve_with_mmr
 
-def retrieve(state: GraphState) -> Dict[str, Any]:
+async def retrieve(state: GraphState, config: RunnableConfig) -> Dict[str, Any]:
     print("---Retrieve---")
     question = state['question']
 
-    documents = retrieve_with_mmr(
+    documents = await aretrieve_with_mmr(
         question,
         owner=state.get("owner"),
         company=state.get("company"),
         category=state.get("category"),
         year=state.get("year"),
+        gm=config.get("configurable", {}).get("graph_manager"),
     )
-    return {"documents": documents, "question": question}
\ No newline at end of file
+    return {"documents": documents}
\ No newline at end of file
@@ -1,35 +1,75 @@
-from typing import Any, Dict
-from dotenv import load_dotenv
+import asyncio
+import hashlib
+from typing import Any, Dict, Optional
 
 from langchain_core.documents import Document
 from langchain_tavily import TavilySearch
 
 from graph.state import GraphState
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
 
 web_search_tool = TavilySearch(max_results=3)
 
 
-def web_search(state: GraphState) -> Dict[str, Any]:
+def _content_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def prefetch_web_search(question: str) -> asyncio.Task:
+    """
+    Start the Tavily search for a question in the background.
+
+    The task is carried to web_search in the run's graph state
+    (web_search_prefetch), so concurrent runs never share or cancel each
+    other's searches.
+    """
+    return asyncio.create_task(web_search_tool.ainvoke({"query": question}))
+
+
+async def _search(question: str, task: Optional[asyncio.Task] = None):
+    if task is not None:
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # Re-raise if this node is being cancelled; otherwise the prefetch was, so search afresh
+            if asyncio.current_task().cancelling() or not task.cancelled():
+                raise
+    return await web_search_tool.ainvoke({"query": question})
+
+
+async def web_search(state: GraphState) -> Dict[str, Any]:
     """
     Performs a web search to find additional documents related to the user's question.
     """
     print("---Web Search---")
     question = state["question"]
-    documents = state["documents"]
+    # web_search is only set by grading. Without it the graph came straight from a retrieval
+    # miss, and the low-scoring retrieved documents are dropped rather than kept as context.
+    documents = state["documents"] if state.get("web_search") else []
+
+    tavily_results = await _search(question, state.get("web_search_prefetch"))
+    # TavilySearch returns the raw response dict; older tools returned the result list itself
+    if isinstance(tavily_results, dict):
+        tavily_results = tavily_results.get("results", [])
+
+    documents = list(documents or [])
+
+    # One Document per hit so each can be graded and cited on its own, skipping
+    # content that is already in the retrieved set or repeated across hits
+    seen = {_content_hash(document.page_content) for document in documents}
+    for tavily_result in tavily_results:
+        content = tavily_result.get("content")
+        if not content:
+            continue
+        digest = _content_hash(content)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        documents.append(Document(page_content=content, metadata={"source": tavily_result.get("url", "web")}))
 
-    tavily_results = web_search_tool.invoke({"query": question})
-    joined_tavily_results = "\n\n".join(
-        [tavily_result["content"] for tavily_result in tavily_results]
-    )
-    web_results = Document(page_content=joined_tavily_results)
-    if documents is not None:
-        documents.append(web_results)
-    else:
-        documents = [web_results]
-    return {"documents": documents, "question": question}
+    return {"documents": documents, "web_search_prefetch": None}
 
 
 if __name__ == "__main__":
-    web_search({"question": "What is the capital of India?", "documents": None})
\ No newline at end of file
+    asyncio.run(web_search({"question": "What is the capital of India?", "documents": None}))
\ No newline at end of file
@@ -1,5 +1,8 @@
+import asyncio
 from typing import Any, Dict, List, Optional, TypedDict
 
+from langchain_core.documents import Document
+
 
 class GraphState(TypedDict):
     """
@@ -14,14 +17,16 @@ class GraphState(TypedDict):
         company: optional filter by company
         category: optional filter by category
         year: optional filter by year
+        web_search_prefetch: web search started during grading, for the web search node to await
 
     """
 
     question: str
     generation: str
     web_search: bool
-    documents: List[str]
+    documents: List[Document]
     owner: Optional[str]
     company: Optional[str]
     category: Optional[str]
     year: Optional[int]
+    web_search_prefetch: Optional[asyncio.Task]
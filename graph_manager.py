@@ -7,14 +7,40 @@ This module handles:
 - Graph queries for filtering documents before vector search
 """
 
+import atexit
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import yaml
 from neo4j import GraphDatabase
-from dotenv import load_dotenv
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
+
+
+# Creates or updates Document nodes and their relationships in a single statement; the
+# FOREACH-over-CASE idiom creates a relationship only when the property is present
+ADD_DOCUMENTS_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Document {source: row.source})
+SET d.filename = row.filename,
+    d.type = row.type,
+    d.description = row.description
+FOREACH (name IN CASE WHEN row.owner IS NULL THEN [] ELSE [row.owner] END |
+    MERGE (o:Owner {name: name})
+    MERGE (d)-[:BELONGS_TO]->(o))
+FOREACH (name IN CASE WHEN row.company IS NULL THEN [] ELSE [row.company] END |
+    MERGE (c:Company {name: name})
+    MERGE (d)-[:FROM_COMPANY]->(c))
+FOREACH (name IN CASE WHEN row.category IS NULL THEN [] ELSE [row.category] END |
+    MERGE (cat:Category {name: name})
+    MERGE (d)-[:HAS_CATEGORY]->(cat))
+FOREACH (value IN CASE WHEN row.year IS NULL THEN [] ELSE [row.year] END |
+    MERGE (y:Year {value: value})
+    MERGE (d)-[:FROM_YEAR]->(y))
+FOREACH (ids IN CASE WHEN row.chunk_ids IS NULL THEN [] ELSE [row.chunk_ids] END |
+    SET d.chunk_ids = ids)
+"""
 
 
 class GraphManager:
@@ -83,6 +109,23 @@ class GraphManager:
         metadata["filename"] = filename
         return metadata
 
+    def _document_row(self, source_path: str, chunk_ids: list[str] = None) -> dict:
+        """Cypher parameters for one document, with its metadata resolved from config."""
+        filename = Path(source_path).name
+        metadata = self.get_document_metadata(filename)
+        return {
+            "source": source_path,
+            "filename": filename,
+            "type": metadata.get("type"),
+            "description": metadata.get("description"),
+            # Falsy values mean "no relationship", matching the config's optional fields
+            "owner": metadata.get("owner") or None,
+            "company": metadata.get("company") or None,
+            "category": metadata.get("category") or None,
+            "year": metadata.get("year") or None,
+            "chunk_ids": chunk_ids or None,
+        }
+
     def add_document(self, source_path: str, chunk_ids: list[str] = None):
         """
         Add a document node to the graph with its metadata and relationships.
@@ -91,86 +134,22 @@ class GraphManager:
             source_path: Full path to the document
             chunk_ids: List of vector store chunk IDs associated with this document
         """
-        filename = Path(source_path).name
-        metadata = self.get_document_metadata(filename)
+        self.add_documents_bulk([{"source": source_path, "chunk_ids": chunk_ids}])
 
-        with self.driver.session() as session:
-            # Create Document node
-            session.run(
-                """
-                MERGE (d:Document {source: $source})
-                SET d.filename = $filename,
-                    d.type = $type,
-                    d.description = $description
-                """,
-                source=source_path,
-                filename=filename,
-                type=metadata.get("type"),
-                description=metadata.get("description"),
-            )
+    def add_documents_bulk(self, items: list[dict], batch_size: int = 1000):
+        """
+        Add many documents in one write transaction per batch_size documents.
 
-            # Create Owner relationship
-            owner = metadata.get("owner")
-            if owner:
-                session.run(
-                    """
-                    MERGE (o:Owner {name: $owner})
-                    MERGE (d:Document {source: $source})
-                    MERGE (d)-[:BELONGS_TO]->(o)
-                    """,
-                    owner=owner,
-                    source=source_path,
-                )
-
-            # Create Company relationship
-            company = metadata.get("company")
-            if company:
-                session.run(
-                    """
-                    MERGE (c:Company {name: $company})
-                    MERGE (d:Document {source: $source})
-                    MERGE (d)-[:FROM_COMPANY]->(c)
-                    """,
-                    company=company,
-                    source=source_path,
-                )
-
-            # Create Category relationship
-            category = metadata.get("category")
-            if category:
-                session.run(
-                    """
-                    MERGE (cat:Category {name: $category})
-                    MERGE (d:Document {source: $source})
-                    MERGE (d)-[:HAS_CATEGORY]->(cat)
-                    """,
-                    category=category,
-                    source=source_path,
-                )
-
-            # Create Year relationship
-            year = metadata.get("year")
-            if year:
-                session.run(
-                    """
-                    MERGE (y:Year {value: $year})
-                    MERGE (d:Document {source: $source})
-                    MERGE (d)-[:FROM_YEAR]->(y)
-                    """,
-                    year=year,
-                    source=source_path,
-                )
-
-            # Store chunk IDs on the document node
-            if chunk_ids:
-                session.run(
-                    """
-                    MATCH (d:Document {source: $source})
-                    SET d.chunk_ids = $chunk_ids
-                    """,
-                    source=source_path,
-                    chunk_ids=chunk_ids,
-                )
+        Args:
+            items: Dicts with a "source" path and optional "chunk_ids" list
+            batch_size: Documents per UNWIND statement
+        """
+        rows = [self._document_row(item["source"], item.get("chunk_ids")) for item in items]
+
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                session.execute_write(lambda tx: tx.run(ADD_DOCUMENTS_QUERY, rows=batch).consume())
 
     def query_documents(
         self,
@@ -220,6 +199,19 @@ class GraphManager:
             result = session.run(query, **params)
             return [record["source"] for record in result]
 
+    def get_chunk_ids(self, sources: list[str]) -> dict:
+        """
+        Get the vector store chunk IDs recorded for each of the given document sources.
+
+        Returns a dict of source path to its list of chunk IDs, or None where none were recorded.
+        """
+        with self.driver.session() as session:
+            result = session.run(
+                "MATCH (d:Document) WHERE d.source IN $sources RETURN d.source AS source, d.chunk_ids AS chunk_ids",
+                sources=sources,
+            )
+            return {record["source"]: record["chunk_ids"] for record in result}
+
     def get_document_sources_for_owner(self, owner: str) -> list[str]:
         """Get all document sources belonging to a specific owner."""
         return self.query_documents(owner=owner)
@@ -312,6 +304,19 @@ class GraphManager:
             return {"nodes": nodes, "edges": edges}
 
 
+@lru_cache(maxsize=1)
+def get_graph_manager() -> GraphManager:
+    """
+    Return a process-wide connected GraphManager.
+
+    The Neo4j driver is thread-safe and pools its connections, so hot paths
+    share this instance instead of opening a new driver per call.
+    """
+    gm = GraphManager().connect()
+    atexit.register(gm.close)
+    return gm
+
+
 # Convenience function for quick queries
 def get_filtered_sources(
     owner: Optional[str] = None,
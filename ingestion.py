@@ -1,27 +1,73 @@
+import argparse
 import asyncio
 import datetime
+import json
 import os
-from dotenv import load_dotenv
+import uuid
 from langchain_core.documents import Document
 from langchain_core.indexing import DocumentIndex
-from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pinecone import Pinecone
-from typing import List
+from typing import List, Optional
 
 from MultiFormatLoader import MultiFormatLoader
+from clients import get_openai_embeddings, get_pinecone_index
 from graph_manager import GraphManager
 from logger import (log_info, log_error, log_header, log_success, log_warning)
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"), chunk_size=50)
+embeddings = get_openai_embeddings("text-embedding-3-large", chunk_size=50)
 
-vectorstore = PineconeVectorStore(index_name=os.getenv("INDEX_NAME"), embedding=embeddings)
+vectorstore = PineconeVectorStore(index=get_pinecone_index(os.getenv("INDEX_NAME")), embedding=embeddings)
+
+def sanitize_unicode(value):
+    """Drop characters that can't be encoded as UTF-8 (e.g. lone surrogates from bad PDF text)."""
+    if isinstance(value, str):
+        # ASCII is always valid UTF-8, which covers most chunks without re-encoding them
+        if value.isascii():
+            return value
+        return value.encode("utf-8", errors="ignore").decode("utf-8")
+    if isinstance(value, dict):
+        return {k: sanitize_unicode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize_unicode(v) for v in value]
+    return value
+
+
+def trim_metadata(metadata, max_bytes=40000):
+    """Trim metadata to fit within Pinecone's 40KB limit."""
+    total = len(json.dumps(metadata))
+    if total <= max_bytes:
+        return metadata
+
+    # json.dumps escapes to ASCII, so string length is byte length. Each entry costs its
+    # encoded key and value plus the ": " and ", " separators.
+    sizes = {
+        k: len(json.dumps(k)) + len(json.dumps(v)) + 4
+        for k, v in metadata.items()
+        if isinstance(v, (str, list))
+    }
+
+    # Remove the largest string values until under the limit
+    for key in sorted(sizes, key=sizes.get, reverse=True):
+        if total <= max_bytes:
+            break
+        del metadata[key]
+        total -= sizes[key]
+    return metadata
+
+
+async def index_documents_async(documents: List[Document], batch_size: int = 50, concurrency: int = 8) -> List[Document]:
+    """
+    Process documents in batches asynchronously, with up to `concurrency` batches in flight.
+
+    Returns the documents that were added, each with its vector store ID set.
+    """
+    for document in documents:
+        if not document.id:
+            document.id = str(uuid.uuid4())
 
-async def index_documents_async(documents: List[Document], batch_size: int = 50):
-    """Process documents in batches asynchronously."""
     log_header("Vector Storage")
     log_info(f"Vector Indexing: Preparing to add {len(documents)} documents to vector store")
 
@@ -31,29 +77,34 @@ async def index_documents_async(documents: List[Document], batch_size: int = 50)
 
     log_info(f"Vector Indexing: Adding {len(batches)} of {batch_size} documents to vector store")
 
-    successful = 0
-    for i, batch in enumerate(batches):
-        batch_num = i + 1
-        try:
-            await vectorstore.aadd_documents(batch)
-            log_success(f"Added {batch_num}/{len(batches)} ({len(batch)}) documents to vector store")
-            successful += 1
-        except Exception as e:
-            log_error(f"Error adding documents {batch_num}: {e}")
-        await asyncio.sleep(1)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def add_batch(batch_num: int, batch: List[Document]) -> List[Document]:
+        async with semaphore:
+            try:
+                await vectorstore.aadd_documents(batch)
+                log_success(f"Added {batch_num}/{len(batches)} ({len(batch)}) documents to vector store")
+                return batch
+            except Exception as e:
+                log_error(f"Error adding documents {batch_num}: {e}")
+                return []
+
+    results = await asyncio.gather(*(add_batch(i + 1, batch) for i, batch in enumerate(batches)))
+    successful = sum(1 for added in results if added)
 
     if successful == len(batches):
         log_success(f"All documents added to vector store ({successful}/{len(batches)})")
     else:
         log_warning(f"Processed {successful}/{len(batches)} batches successfully")
 
+    return [document for added in results for document in added]
+
 
 def clear_pinecone_index():
     """Delete all vectors from the Pinecone index."""
     log_header("Clearing Pinecone Index")
 
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    index = pc.Index(os.getenv("INDEX_NAME"))
+    index = get_pinecone_index(os.getenv("INDEX_NAME"))
 
     # Delete all vectors by using delete with delete_all
     try:
@@ -64,8 +115,13 @@ def clear_pinecone_index():
     log_success("Pinecone index cleared successfully")
 
 
-def populate_graph(documents: List[Document]):
-    """Populate Neo4j graph with document metadata."""
+def populate_graph(documents: List[Document], chunks: Optional[List[Document]] = None):
+    """
+    Populate Neo4j graph with document metadata.
+
+    If the indexed chunks are given, each document node also records the
+    vector store IDs of its chunks.
+    """
     log_header("Populating Knowledge Graph")
 
     with GraphManager() as gm:
@@ -80,16 +136,19 @@ def populate_graph(documents: List[Document]):
             if source:
                 unique_sources.add(source)
 
+        chunk_ids = {}
+        for chunk in chunks or []:
+            chunk_ids.setdefault(chunk.metadata.get("source"), []).append(chunk.id)
+
         log_info(f"Adding {len(unique_sources)} documents to graph")
 
-        for source in unique_sources:
-            gm.add_document(source)
+        gm.add_documents_bulk([{"source": source, "chunk_ids": chunk_ids.get(source)} for source in unique_sources])
 
         stats = gm.get_graph_stats()
         log_success(f"Graph populated: {stats}")
 
 
-async def ingestion():
+async def ingestion(refresh: bool = False):
 
     log_header(f"Ingestion started on {datetime.datetime.now()}\n\n")
 
@@ -99,7 +158,7 @@ async def ingestion():
     log_info(f"Loading documents...")
 
     loader = MultiFormatLoader("./documents/")
-    all_documents = loader.load_all()
+    all_documents = loader.load_all(refresh=refresh)
 
     log_info(f"Loaded {len(all_documents)} documents\n\n")
     log_header(f"Splitting {len(all_documents)} documents on {datetime.datetime.now()}\n\n")
@@ -114,34 +173,6 @@ async def ingestion():
     log_info(f"{len(splits)} Chunks\n\n")
     log_header(f"Sanitizing {len(splits)} chunks on {datetime.datetime.now()}\n\n")
 
-    def sanitize_unicode(value):
-        if isinstance(value, str):
-            return value.encode("utf-8", errors="ignore").decode("utf-8")
-        if isinstance(value, dict):
-            return {k: sanitize_unicode(v) for k, v in value.items()}
-        if isinstance(value, list):
-            return [sanitize_unicode(v) for v in value]
-        return value
-
-    import json
-
-    def trim_metadata(metadata, max_bytes=40000):
-        """Trim metadata to fit within Pinecone's 40KB limit."""
-        encoded = json.dumps(metadata).encode("utf-8")
-        if len(encoded) <= max_bytes:
-            return metadata
-        # Remove the largest string values until under the limit
-        while len(json.dumps(metadata).encode("utf-8")) > max_bytes:
-            largest_key = max(
-                (k for k, v in metadata.items() if isinstance(v, (str, list))),
-                key=lambda k: len(json.dumps(metadata[k]).encode("utf-8")),
-                default=None,
-            )
-            if largest_key is None:
-                break
-            del metadata[largest_key]
-        return metadata
-
     for split in splits:
         split.page_content = sanitize_unicode(split.page_content)
         split.metadata = trim_metadata(sanitize_unicode(split.metadata))
@@ -150,13 +181,17 @@ async def ingestion():
     log_header(f"Ingesting {len(splits)} chunks on {datetime.datetime.now()}\n\n")
 
 
-    await index_documents_async(splits, batch_size=200)
+    indexed = await index_documents_async(splits, batch_size=200)
 
     # Populate the knowledge graph with document metadata
-    populate_graph(all_documents)
+    populate_graph(all_documents, indexed)
 
     log_header("Ingestion finished!")
 
 if __name__ == "__main__":
-    asyncio.run(ingestion())
+    parser = argparse.ArgumentParser(description="Ingest ./documents into Pinecone and the knowledge graph")
+    parser.add_argument("--refresh", action="store_true", help="Re-parse every file, ignoring the loader cache")
+    args = parser.parse_args()
+
+    asyncio.run(ingestion(refresh=args.refresh))
 
@@ -1,59 +1,78 @@
 import os
-import sys
 
-from dotenv import load_dotenv
+from langchain_community.cache import SQLiteCache
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import JsonOutputParser, JsonOutputToolsParser, PydanticToolsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from langchain_anthropic import ChatAnthropic, convert_to_anthropic_tool
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from retrieval import search_documents
 
 from .schemas import AnswerQuestion, ReviseAnswer
 
 # tools = [search_documents]
 
-llm = ChatAnthropic(model_name="claude-sonnet-4-5", temperature=0)
+# Exact-match cache of agent LLM responses; the models run at temperature 0, so a repeated
+# request would get the same answer anyway. Off unless LLM_CACHE_PATH is set (e.g. to
+# ~/.cache/financehelper/llm_cache.db): entries never expire and outlive re-ingestion,
+# so delete the file after documents change.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+llm_cache = None
+if LLM_CACHE_PATH:
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+    llm_cache = SQLiteCache(database_path=LLM_CACHE_PATH)
+
+# Marks the end of a prompt prefix for Anthropic to cache, so repeat calls only pay for what follows it
+CACHE_CONTROL = {"type": "ephemeral"}
+
+def cache_tools(tools: list) -> list:
+    """Anthropic tool definitions for tools, with a cache breakpoint after the last one."""
+    definitions = [convert_to_anthropic_tool(tool) for tool in tools]
+    definitions[-1] = {**definitions[-1], "cache_control": CACHE_CONTROL}
+    return definitions
+
+llm = ChatAnthropic(model_name="claude-sonnet-4-5", temperature=0, cache=llm_cache)
 parser = JsonOutputToolsParser(return_id=True)
 pydantic_parser = PydanticToolsParser(tools=[AnswerQuestion])
 
+ACTOR_SYSTEM_PROMPT = (
+    "You are an expert in the field and tasked with creating the most useful and meaningful content."
+    "Generate the best possible content for the user's request."
+    "{revisor_instructions}"
+    "If the user provides critique, respond with a revised version of your previous attempts."
+    "Reflect and critique your answer. Be severe to maximise improvement"
+    "Recommend search queries to research information and improve your answer"
+    "You have access to a tool that retrieves relevant data. "
+    "Use the tool to find the relevant information before answering questions. "
+    "Always cite the sources you use in the answers. "
+    "If you're responding an API Spec, use a standard JSON or Swagger format only."
+    "If you are responding with any kind of chart or diagram, respond in mermaid format only. "
+    "Always wrap mermaid code in a fenced code block: ```mermaid\\n...\\n```. "
+    "Do not include any non-mermaid text inside the mermaid code block. Put explanations outside. "
+    "CRITICAL mermaid syntax rules you MUST follow: "
+        "1. Every node must have an ID and a label in brackets: A[Label] not just Label. "
+        "2. Node labels with parentheses or special characters MUST be quoted: A[\"Label (abbrev)\"]. "
+        "3. Edge labels must use pipe syntax: A -->|label text| B, NOT A -- label text --> B. "
+        "4. Each statement must be on its own line. "
+        "5. Node IDs must be single words with no spaces (use underscores). "
+        "6. Do not use colons in labels unless quoted. "
+    "Do not assume any information, only work with the context provided to you"
+    "If you cannot find the answer in the retrieved data, say so."
+)
+
 actor_prompt_template = ChatPromptTemplate.from_messages(
     [
-        (
-            "system",
-            "You are an expert in the field and tasked with creating the most useful and meaningful content."
-            "Generate the best possible content for the user's request."
-            "{revisor_instructions}"
-            "If the user provides critique, respond with a revised version of your previous attempts."
-            "Reflect and critique your answer. Be severe to maximise improvement"
-            "Recommend search queries to research information and improve your answer"
-            "You have access to a tool that retrieves relevant data. "
-            "Use the tool to find the relevant information before answering questions. "
-            "Always cite the sources you use in the answers. "
-            "If you're responding an API Spec, use a standard JSON or Swagger format only."
-            "If you are responding with any kind of chart or diagram, respond in mermaid format only. "
-            "Always wrap mermaid code in a fenced code block: ```mermaid\\n...\\n```. "
-            "Do not include any non-mermaid text inside the mermaid code block. Put explanations outside. "
-            "CRITICAL mermaid syntax rules you MUST follow: "
-                "1. Every node must have an ID and a label in brackets: A[Label] not just Label. "
-                "2. Node labels with parentheses or special characters MUST be quoted: A[\"Label (abbrev)\"]. "
-                "3. Edge labels must use pipe syntax: A -->|label text| B, NOT A -- label text --> B. "
-                "4. Each statement must be on its own line. "
-                "5. Node IDs must be single words with no spaces (use underscores). "
-                "6. Do not use colons in labels unless quoted. "
-            "Do not assume any information, only work with the context provided to you"
-            "If you cannot find the answer in the retrieved data, say so."
-        ),
+        ("system", [{"type": "text", "text": ACTOR_SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]),
         MessagesPlaceholder(variable_name="messages")
     ]
 )
 
 first_responder = actor_prompt_template.partial(revisor_instructions="") | llm.bind_tools(
-    tools=[AnswerQuestion], tool_choice="AnswerQuestion"
+    tools=cache_tools([AnswerQuestion]), tool_choice="AnswerQuestion"
 )
 
 revise_instructions = """
@@ -66,8 +85,9 @@ revise_instructions = """
                         - You should use your previous critique to remove superfluous information from your answer and make sure you stay within the context.
                     """
 
+# Each revision re-sends the whole conversation so far, so the tail is cached for the next round too
 revisor = (actor_prompt_template.partial(revisor_instructions=revise_instructions)
-           | llm.bind_tools(tools=[ReviseAnswer], tool_choice="ReviseAnswer"))
+           | llm.bind_tools(tools=cache_tools([ReviseAnswer]), tool_choice="ReviseAnswer").bind(cache_control=CACHE_CONTROL))
 
 if __name__ == "__main__":
     human_message = HumanMessage(
@@ -1,11 +1,11 @@
-from dotenv import load_dotenv
 from langchain_classic.evaluation.scoring.prompt import SYSTEM_MESSAGE
 from langgraph.graph import MessagesState
 from langgraph.prebuilt import ToolNode
 
+from .chains import CACHE_CONTROL
 from .react import llm, tools
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
 
 SYS_MESSAGE = (
     "You are a helpful AI assistant that answers user's questions. "
@@ -26,12 +26,13 @@ SYS_MESSAGE = (
     "If you cannot find the answer in the retrieved data, say so."
 )
 
-def run_agent_reasoning(state: MessagesState) -> MessagesState:
+async def run_agent_reasoning(state: MessagesState) -> MessagesState:
     """
     Run the agent reasoning node
     """
 
-    response = llm.invoke([{"role": "system", "content": SYS_MESSAGE}, *state["messages"]])
+    system_message = {"role": "system", "content": [{"type": "text", "text": SYS_MESSAGE, "cache_control": CACHE_CONTROL}]}
+    response = await llm.ainvoke([system_message, *state["messages"]])
     return {"messages": [response]}
 
 tool_node = ToolNode(tools)
\ No newline at end of file
@@ -1,18 +1,18 @@
-import os
-import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional
 
-from dotenv import load_dotenv
 from langchain_core.tools import tool, StructuredTool
 from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
 from langgraph.prebuilt import ToolNode
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from retrieval import search_documents
+from retrieval import query_cache, search_documents
+from . import chains
+from .chains import cache_tools
 from .schemas import AnswerQuestion, ReviseAnswer
 
-
-load_dotenv()
+import bootstrap  # noqa: F401
 
 @tool
 def triple(num: float) -> float:
@@ -22,22 +22,68 @@ def triple(num: float) -> float:
     """
     return float(num) ** 3
 
-tools = [search_documents, triple]
+def cached_search(query: str) -> str:
+    """search_documents, memoized per query string in the shared retrieval cache (TTL, cleared on invalidate)."""
+    cache_key = ("search_documents", query)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached[0]
+
+    result = search_documents.invoke(query)
+    query_cache.put(cache_key, [result])
+    return result
+
+# Same name, description and arguments as search_documents, so the model sees no difference.
+# The query is passed positionally so tool calls and run_queries share cache keys.
+cached_search_documents = StructuredTool.from_function(
+    lambda query: cached_search(query),
+    name=search_documents.name,
+    description=search_documents.description,
+    args_schema=search_documents.args_schema,
+)
+
+tools = [cached_search_documents, triple]
+
+# Searches run at once per tool call; the queries are independent, but the vector store is shared
+SEARCH_CONCURRENCY = 4
+
+# Search results for the current agent run, keyed by query, so a query repeated in a later
+# revision round is answered without searching again. Set by the caller around each run.
+search_cache: ContextVar[Optional[dict]] = ContextVar("search_cache", default=None)
 
 def run_queries(search_queries: list[str], **kwargs):
     """Execute search queries against the document store and return results."""
-    return "\n\n".join(search_documents.invoke(query) for query in search_queries)
+    queries = list(dict.fromkeys(search_queries))
+    with ThreadPoolExecutor(max_workers=SEARCH_CONCURRENCY) as executor:
+        return "\n\n".join(executor.map(cached_search, queries))
+
+async def arun_queries(search_queries: list[str], **kwargs):
+    """Async version of run_queries, used when the graph runs under ainvoke."""
+    queries = list(dict.fromkeys(search_queries))
+    cache = search_cache.get()
+    if cache is None:
+        cache = {}
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+    async def search(query: str) -> str:
+        if query not in cache:
+            async with semaphore:
+                cache[query] = await asyncio.to_thread(cached_search, query)
+        return cache[query]
+
+    return "\n\n".join(await asyncio.gather(*(search(query) for query in queries)))
 
 execute_tools = ToolNode(
     [
-        StructuredTool.from_function(run_queries, name=AnswerQuestion.__name__),
-        StructuredTool.from_function(run_queries, name=ReviseAnswer.__name__)
+        StructuredTool.from_function(run_queries, coroutine=arun_queries, name=AnswerQuestion.__name__),
+        StructuredTool.from_function(run_queries, coroutine=arun_queries, name=ReviseAnswer.__name__)
 
     ]
 )
 
 # llm = ChatOpenAI(model="gpt-4.1", temperature=0).bind_tools(tools)
-llm = ChatAnthropic(model_name="claude-sonnet-4-5", temperature=0).bind_tools(tools)
+# The same client as chains.py, so both reuse one Anthropic SDK client and its connections
+llm = chains.llm.bind_tools(cache_tools(tools))
 
 
 
@@ -0,0 +1,101 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage, message_to_dict, messages_from_dict
+
+import bootstrap  # noqa: F401
+
+# Set AGENT_SEMCACHE=1 to answer near-duplicate questions with the draft of an earlier one
+AGENT_SEMCACHE = os.getenv("AGENT_SEMCACHE", "0") == "1"
+
+# Cosine similarity between question embeddings above which a cached draft is reused
+AGENT_SEMCACHE_THRESHOLD = float(os.getenv("AGENT_SEMCACHE_THRESHOLD", "0.92"))
+
+AGENT_SEMCACHE_PATH = os.getenv(
+    "AGENT_SEMCACHE_PATH", os.path.expanduser("~/.cache/financehelper/agent_semcache.jsonl")
+)
+
+
+class SemanticCache:
+    """
+    Semantic cache of draft answers, keyed by question embedding.
+
+    Entries are held as one matrix of unit-normalized question vectors, so a
+    lookup is a single matrix-vector product. When a path is given, entries
+    are appended to it as JSON lines and reloaded on start, so paraphrases of
+    questions from earlier sessions hit as well.
+    """
+
+    def __init__(self, threshold: float = AGENT_SEMCACHE_THRESHOLD, path: Optional[str] = AGENT_SEMCACHE_PATH):
+        self.threshold = threshold
+        self.path = path
+        self._vectors = []
+        self._messages = []
+        self._matrix = None
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    vector = np.asarray(entry["vector"], dtype=np.float32)
+                    message = messages_from_dict([entry["message"]])[0]
+                except Exception as e:
+                    print(f"Error loading semantic cache entry: {e}")
+                    continue
+                self._vectors.append(vector)
+                self._messages.append(message)
+
+    @staticmethod
+    def normalize(question_embedding) -> np.ndarray:
+        """Unit-normalize a question embedding so similarity is a plain dot product."""
+        vector = np.asarray(question_embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, question_vector: np.ndarray) -> Optional[AIMessage]:
+        """Return the cached draft for the most similar earlier question, if it clears the threshold."""
+        if not self._vectors:
+            return None
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors)
+
+        similarities = self._matrix @ question_vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return self._messages[best]
+        return None
+
+    def put(self, question_vector: np.ndarray, message: AIMessage) -> None:
+        """Remember the draft for this question, on disk as well if the cache has a path."""
+        self._vectors.append(question_vector)
+        self._messages.append(message)
+        self._matrix = None
+
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"vector": question_vector.tolist(), "message": message_to_dict(message)}) + "\n")
+            except Exception as e:
+                print(f"Error saving semantic cache entry: {e}")
+
+    def invalidate(self) -> None:
+        """Forget every draft, on disk as well, e.g. after re-ingesting documents."""
+        self._vectors = []
+        self._messages = []
+        self._matrix = None
+
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error clearing semantic cache: {e}")
+
+
+semantic_cache = SemanticCache() if AGENT_SEMCACHE else None
@@ -0,0 +1,30 @@
+from langchain_core.messages import AIMessage
+
+from langgraph_agents.semantic_cache import SemanticCache
+
+
+def test_reuses_draft_for_similar_question() -> None:
+    cache = SemanticCache(threshold=0.9, path=None)
+    cache.put(SemanticCache.normalize([1.0, 0.0]), AIMessage(content="draft"))
+
+    assert cache.get(SemanticCache.normalize([1.0, 0.1])).content == "draft"
+    assert cache.get(SemanticCache.normalize([0.0, 1.0])) is None
+
+
+def test_drafts_persist_across_instances(tmp_path) -> None:
+    path = str(tmp_path / "semcache.jsonl")
+    SemanticCache(path=path).put(SemanticCache.normalize([1.0, 0.0]), AIMessage(content="draft"))
+
+    assert SemanticCache(path=path).get(SemanticCache.normalize([1.0, 0.0])).content == "draft"
+
+
+def test_invalidate_clears_memory_and_disk(tmp_path) -> None:
+    path = tmp_path / "semcache.jsonl"
+    cache = SemanticCache(path=str(path))
+    cache.put(SemanticCache.normalize([1.0, 0.0]), AIMessage(content="draft"))
+
+    cache.invalidate()
+
+    assert cache.get(SemanticCache.normalize([1.0, 0.0])) is None
+    assert not path.exists()
+    assert SemanticCache(path=str(path)).get(SemanticCache.normalize([1.0, 0.0])) is None
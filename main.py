@@ -1,11 +1,13 @@
 import re
+from functools import lru_cache
 from typing import List, Any, Dict
 
 import streamlit as st
 import streamlit_mermaid as stmd
 
 
-from backend.core import run_llm
+from backend.core import astream_llm
+from clients import iterate_sync
 
 
 _MERMAID_START = re.compile(
@@ -15,11 +17,19 @@ _MERMAID_START = re.compile(
 
 _FENCED_MERMAID = re.compile(r"```mermaid\s*\n(.*?)```", re.DOTALL)
 
+# A line continues a raw mermaid diagram if it starts with a statement keyword or a node
+# definition, or contains an edge
+_MERMAID_PREFIXES = ("style ", "classDef ", "class ", "subgraph", "end")
+_MERMAID_NODE = re.compile(r"\w+[\[\(\{]")
+_MERMAID_EDGE = re.compile(r"-\.?->|---")
 
-def _extract_mermaid_blocks(text: str) -> list[tuple[str, bool]]:
+
+@lru_cache(maxsize=256)
+def _extract_mermaid_blocks(text: str) -> tuple[tuple[str, bool], ...]:
     """
     Parse text into segments of (content, is_mermaid).
     Handles both fenced (```mermaid) and raw mermaid blocks.
+    Cached, since Streamlit re-renders the whole chat history on every rerun.
     """
     segments = []
     last_end = 0
@@ -37,12 +47,12 @@ def _extract_mermaid_blocks(text: str) -> list[tuple[str, bool]]:
     if segments:
         if remaining.strip():
             segments.append((remaining, False))
-        return segments
+        return tuple(segments)
 
     # No fenced blocks — look for raw mermaid syntax
     match = _MERMAID_START.search(text)
     if not match:
-        return [(text, False)]
+        return ((text, False),)
 
     before = text[:match.start()]
     if before.strip():
@@ -56,18 +66,11 @@ def _extract_mermaid_blocks(text: str) -> list[tuple[str, bool]]:
         if in_diagram:
             stripped = line.strip()
             if (stripped == ""
-                    or line.startswith("    ")
-                    or line.startswith("\t")
+                    or line.startswith(("    ", "\t"))
                     or _MERMAID_START.match(line)
-                    or stripped.startswith("style ")
-                    or stripped.startswith("classDef ")
-                    or stripped.startswith("class ")
-                    or "-->" in stripped
-                    or "---" in stripped
-                    or "-.->" in stripped
-                    or stripped.startswith("subgraph")
-                    or stripped.startswith("end")
-                    or re.match(r"^\s*\w+[\[\(\{]", stripped)):
+                    or stripped.startswith(_MERMAID_PREFIXES)
+                    or _MERMAID_NODE.match(stripped)
+                    or _MERMAID_EDGE.search(stripped)):
                 mermaid_lines.append(line)
             else:
                 in_diagram = False
@@ -84,7 +87,7 @@ def _extract_mermaid_blocks(text: str) -> list[tuple[str, bool]]:
     if rest:
         segments.append((rest, False))
 
-    return segments
+    return tuple(segments)
 
 
 def _render_with_mermaid(text: str):
@@ -137,10 +140,25 @@ if prompt:
 
     with st.chat_message("assistant"):
         try:
-            with st.spinner("Retrieving docs and generating an answer"):
-                result: Dict[str, Any] = run_llm(prompt)
-                answer = str(result.get("answer", "").strip() or "(No answer received)")
-                sources = _format_sources(result.get("context", []))
+            result: Dict[str, Any] = {}
+
+            async def stream_answer():
+                async for kind, value in astream_llm(prompt):
+                    if kind == "token":
+                        yield value
+                    else:
+                        result.update(value)
+
+            # Show the raw text as it arrives, then swap in the rendered answer with diagrams.
+            # Streamed on the shared background loop: Streamlit would run an async generator on a
+            # new loop per answer, stranding the model clients' connections from the previous one.
+            streamed = st.empty()
+            with streamed.container():
+                st.write_stream(iterate_sync(stream_answer()))
+            streamed.empty()
+
+            answer = str(result.get("answer", "").strip() or "(No answer received)")
+            sources = _format_sources(result.get("context", []))
 
             _render_with_mermaid(answer)
             if sources:
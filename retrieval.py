@@ -1,42 +1,493 @@
+import asyncio
+import io
+import json
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from operator import itemgetter
 
-from dotenv import load_dotenv
+import numpy as np
+import simsimd
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import LocalFileStore
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
+from pinecone.exceptions import PineconeApiException
+from pydantic import BaseModel, Field
 from typing import Optional
 
-from graph_manager import GraphManager
+from clients import get_chat_openai, get_openai_embeddings, get_pinecone_index
+from graph_manager import GraphManager, get_graph_manager
+from token_utils import count_tokens, trim_tokens
+from vector_cache import LocalVectorCache
 
-load_dotenv(override=True)
+import bootstrap  # noqa: F401
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
-llm = ChatOpenAI(model="gpt-4.1")
+# Query embeddings are persisted here so repeated questions skip the OpenAI round-trip across restarts
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.expanduser("~/.cache/financehelper/embeddings"))
+QUERY_EMBEDDING_LRU_SIZE = 4096
 
-vectorstore = PineconeVectorStore(index_name=os.getenv("INDEX_NAME"), embedding=embeddings)
+_openai_embeddings = get_openai_embeddings("text-embedding-3-large")
+embeddings = CacheBackedEmbeddings.from_bytes_store(
+    _openai_embeddings,
+    LocalFileStore(EMBEDDING_CACHE_DIR),
+    namespace=_openai_embeddings.model,
+    query_embedding_cache=True,
+    key_encoder="sha256",
+)
+llm = get_chat_openai("gpt-4.1")
+
+# Metadata field the chunk text is stored under in Pinecone
+TEXT_KEY = "text"
+
+vectorstore = PineconeVectorStore(index=get_pinecone_index(os.getenv("INDEX_NAME")), embedding=embeddings, text_key=TEXT_KEY)
+
+# Set LOCAL_VECTOR_CACHE=1 to serve MMR retrieval from a local memory-mapped copy of the index,
+# downloaded on first start; call refresh_local_cache() after re-ingesting
+LOCAL_VECTOR_CACHE = os.getenv("LOCAL_VECTOR_CACHE", "0") == "1"
+LOCAL_VECTOR_CACHE_DIR = os.getenv(
+    "LOCAL_VECTOR_CACHE_DIR", os.path.expanduser("~/.cache/financehelper/vectors")
+)
+
+local_vectors = LocalVectorCache(vectorstore.index, LOCAL_VECTOR_CACHE_DIR, vectorstore._namespace)
+if LOCAL_VECTOR_CACHE:
+    local_vectors.load()
 
 # Score threshold - only return documents with similarity >= this value
 # Pinecone returns cosine similarity scores between 0 and 1 (higher = more similar)
 SCORE_THRESHOLD = 0.75
 
+# Matches fetched by the first round of retrieve_with_score_filter, doubled while all clear the threshold
+SCORE_FILTER_INITIAL_K = 20
+
+# Tokens of retrieved context put into the answer prompt
+CONTEXT_MAX_TOKENS = 6000
+
 # MMR lambda - balance between relevance (0) and diversity (1)
 # 0.5 = equal weight, 0.7 = more diversity, 0.3 = more relevance
 MMR_LAMBDA = 0.5
 
+# Set SERVER_SIDE_MMR=1 to have Pinecone rerank the fetch_k candidates and return only k of them.
+# This is relevance reranking, not MMR: results are not diversified.
+SERVER_SIDE_MMR = os.getenv("SERVER_SIDE_MMR") == "1"
+SERVER_RERANK_MODEL = os.getenv("SERVER_RERANK_MODEL", "bge-reranker-v2-m3")
+
+# Rerank MMR candidates on int8-quantized vectors; only their relative order matters, not exact similarities
+MMR_INT8 = os.getenv("MMR_INT8", "1") == "1"
+
+# Filters matching at most this many chunks are served by fetching those chunks by ID, skipping the ANN search
+SMALL_FILTER_MAX_CHUNKS = 200
+
+# IDs per Pinecone fetch request, keeping the request URL well under size limits
+FETCH_BATCH_SIZE = 100
+
+# Index queries in flight at once for retrieve_batch
+RETRIEVAL_BATCH_CONCURRENCY = 8
+
+# Filter combinations search_documents retrieves from in parallel and merges, as a JSON list of
+# keyword dicts for retrieve_with_mmr, e.g. '[{"owner": "Ved Muthal"}, {}]'. Default: one unfiltered search.
+# Parsed on first search (see _search_shards), so a bad value can't break importing this module.
+SEARCH_SHARDS = os.getenv("SEARCH_SHARDS", "[{}]")
+
+# Seconds a retrieval result is reused for an identical query and filters
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "300"))
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of retrieval results with a time-to-live.
+
+    Keys are tuples of the retrieval function, the normalized query and every
+    argument that affects the result. Call invalidate() after the index changes.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = RETRIEVAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: tuple) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            # A copy, so callers can filter or extend the list without touching the cache
+            return list(entry[1])
+
+    def put(self, key: tuple, docs: list) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), list(docs))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryCache()
+
+# Graph lookups: sources per (owner, company, category, year), chunk IDs per ("chunk_ids", *sources)
+sources_cache = QueryCache(max_size=256)
+
+_query_vectors: OrderedDict = OrderedDict()
+# Queries are embedded from several threads at once (run_queries, retrieve_batch)
+_query_vectors_lock = threading.Lock()
+
+
+def _normalize_query(query: str) -> str:
+    """Cache key for a query; the text sent for embedding keeps its case (tickers, IDs)."""
+    return " ".join(query.lower().split())
+
+
+def _cached_query_vector(query: str) -> Optional[list]:
+    with _query_vectors_lock:
+        vector = _query_vectors.get(query)
+        if vector is not None:
+            _query_vectors.move_to_end(query)
+        return vector
+
+
+def _remember_query_vector(query: str, vector: list) -> list:
+    with _query_vectors_lock:
+        _query_vectors[query] = vector
+        _query_vectors.move_to_end(query)
+        if len(_query_vectors) > QUERY_EMBEDDING_LRU_SIZE:
+            _query_vectors.popitem(last=False)
+    return vector
+
+
+def embed_query(query: str) -> list:
+    """Embed a search query, served from memory, then the on-disk cache, then OpenAI."""
+    key = _normalize_query(query)
+    vector = _cached_query_vector(key)
+    if vector is None:
+        vector = _remember_query_vector(key, embeddings.embed_query(query))
+    return vector
+
+
+async def aembed_query(query: str) -> list:
+    """Async version of embed_query."""
+    key = _normalize_query(query)
+    vector = _cached_query_vector(key)
+    if vector is None:
+        vector = _remember_query_vector(key, await embeddings.aembed_query(query))
+    return vector
+
+
+def embed_queries(queries: list) -> list:
+    """Embed several search queries, sending the ones not cached in memory to OpenAI in one request."""
+    keys = [_normalize_query(query) for query in queries]
+    # Answered from this dict rather than the LRU, which may evict part of a large batch
+    vectors = {key: _cached_query_vector(key) for key in keys}
+    # The first spelling of each uncached key is the text that gets embedded
+    missing = {}
+    for key, query in zip(keys, queries):
+        if vectors[key] is None:
+            missing.setdefault(key, query)
+    if missing:
+        for key, vector in zip(missing, embeddings.embed_documents(list(missing.values()))):
+            vectors[key] = _remember_query_vector(key, vector)
+    return [vectors[key] for key in keys]
+
+
+def _to_document(match, score_key: str = "relevance_score") -> Document:
+    """Build a Document from a Pinecone match, keeping its score in metadata[score_key]."""
+    metadata = dict(match["metadata"])
+    page_content = metadata.pop(TEXT_KEY)
+    metadata[score_key] = match["score"]
+    return Document(id=match.get("id"), page_content=page_content, metadata=metadata)
+
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """
+    Quantize float vectors to int8 with a symmetric scale per vector.
+
+    Cosine similarity ignores each vector's scale, so the quantized vectors
+    can go straight into the int8 cosine kernels without rescaling.
+    """
+    scale = np.max(np.abs(vectors), axis=-1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(vectors / scale).astype(np.int8)
+
+
+def mmr_simsimd(query_vec: np.ndarray, cand_vecs: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA) -> list:
+    """
+    Select k candidate indices by maximal marginal relevance.
+
+    Both cosine matrices are computed once with simsimd's SIMD kernels; the
+    greedy selection then only keeps a running max of each candidate's
+    similarity to the documents picked so far.
+    """
+    k = min(k, len(cand_vecs))
+    if k <= 0:
+        return []
+
+    relevance = 1.0 - np.asarray(simsimd.cdist(query_vec[None, :], cand_vecs, metric="cosine"))[0]
+    pairwise = 1.0 - np.asarray(simsimd.cdist(cand_vecs, cand_vecs, metric="cosine"))
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(cand_vecs), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
+
+
+def _select_mmr(embedding: list, matches: list, k: int) -> list:
+    """
+    Run MMR over Pinecone matches and build Documents for the selected ones.
+
+    Each Document keeps the match's similarity to the query in
+    metadata["relevance_score"] so later stages can use it without re-scoring.
+    """
+    query_vec = np.asarray(embedding, dtype=np.float32)
+    cand_vecs = np.asarray([match["values"] for match in matches], dtype=np.float32)
+    if MMR_INT8:
+        query_vec, cand_vecs = quantize_int8(query_vec), quantize_int8(cand_vecs)
+
+    selected = mmr_simsimd(query_vec, cand_vecs, k=k)
+
+    return [_to_document(matches[i]) for i in selected]
+
+
+# Cleared once the index reports it can't rerank, so later queries go straight to the client-side path
+_server_mmr_supported = True
+
+
+def _is_unsupported(error: Exception) -> bool:
+    """Whether a server-side search failed because the index or client can't do it, rather than transiently."""
+    if isinstance(error, AttributeError):
+        return True
+    if isinstance(error, PineconeApiException):
+        return error.status in (404, 405, 501) or "not supported" in str(error).lower()
+    return False
+
+
+def retrieve_with_mmr_server(
+    query: str, k: int, fetch_k: int, filter_dict: Optional[dict] = None, embedding: Optional[list] = None
+) -> Optional[list]:
+    """
+    Rerank the fetch_k nearest candidates on Pinecone and return only the top k as Documents.
+
+    Pinecone has no MMR operator, so this uses its search endpoint with a
+    hosted reranker instead: candidate vectors never leave the server and
+    the response carries k records instead of fetch_k. Unlike MMR, the
+    results are ranked by relevance alone and not diversified.
+
+    The reranker score is not a cosine similarity, so it is kept in
+    metadata["rerank_score"] and the Documents carry no "relevance_score";
+    score-based routing and grading treat them as unscored. Returns None if
+    the search fails, so callers can fall back to client-side MMR.
+    """
+    global _server_mmr_supported
+    if not _server_mmr_supported:
+        return None
+
+    search_query = {"top_k": fetch_k, "vector": {"values": embedding or embed_query(query)}}
+    if filter_dict:
+        search_query["filter"] = filter_dict
+    try:
+        response = vectorstore.index.search(
+            namespace=vectorstore._namespace or "__default__",
+            query=search_query,
+            rerank={"model": SERVER_RERANK_MODEL, "rank_fields": [TEXT_KEY], "top_n": k, "query": query},
+        )
+    except Exception as e:
+        print(f"Error in server-side reranking, falling back to client-side MMR: {e}")
+        if _is_unsupported(e):
+            _server_mmr_supported = False
+        return None
+
+    return [
+        _to_document({"id": hit["_id"], "metadata": hit["fields"], "score": hit["_score"]}, score_key="rerank_score")
+        for hit in response.result.hits
+    ]
+
+
+def _fetch_candidates(chunk_ids: list, embedding: list, fetch_k: int) -> list:
+    """
+    Fetch chunks by ID and score them against the query locally.
+
+    Returns the fetch_k best as Pinecone-style matches (id, score, values,
+    metadata), so they can go through the same MMR step as a query response.
+    """
+    vectors = {}
+    for start in range(0, len(chunk_ids), FETCH_BATCH_SIZE):
+        response = vectorstore.index.fetch(ids=chunk_ids[start:start + FETCH_BATCH_SIZE], namespace=vectorstore._namespace)
+        vectors.update(response.vectors)
+    if not vectors:
+        return []
+
+    fetched = list(vectors.values())
+    values = np.asarray([vector.values for vector in fetched], dtype=np.float32)
+    query_vec = np.asarray(embedding, dtype=np.float32)
+    scores = 1.0 - np.asarray(simsimd.cdist(query_vec[None, :], values, metric="cosine"))[0]
+
+    return [
+        {"id": fetched[i].id, "score": float(scores[i]), "values": fetched[i].values, "metadata": fetched[i].metadata}
+        for i in np.argsort(-scores)[:fetch_k]
+    ]
+
+
+def _search_mmr(
+    query: str, embedding: list, k: int, fetch_k: int, filter_dict: Optional[dict], chunk_ids: Optional[list] = None
+) -> list:
+    """
+    Fetch fetch_k candidates for a query and narrow them to k.
+
+    Candidates come from the local copy of the index when it is loaded.
+    Otherwise, when the filter's chunks are known (chunk_ids), they are
+    fetched directly instead of searched for; failing that they come from
+    the index, reranked server-side when enabled.
+    """
+    if local_vectors.ready:
+        sources = filter_dict["source"]["$in"] if filter_dict else None
+        return _select_mmr(embedding, local_vectors.candidates(embedding, fetch_k, sources), k)
+
+    if chunk_ids:
+        return _select_mmr(embedding, _fetch_candidates(chunk_ids, embedding, fetch_k), k)
+
+    if SERVER_SIDE_MMR:
+        docs = retrieve_with_mmr_server(query, k, fetch_k, filter_dict, embedding)
+        if docs is not None:
+            return docs
+
+    results = vectorstore.index.query(
+        vector=embedding,
+        top_k=fetch_k,
+        include_values=True,
+        include_metadata=True,
+        filter=filter_dict,
+    )
+    return _select_mmr(embedding, results["matches"], k)
+
+
+def refresh_local_cache() -> None:
+    """Re-download the local copy of the index if it is enabled, and drop results retrieved from the old one."""
+    if LOCAL_VECTOR_CACHE:
+        try:
+            local_vectors.refresh()
+        except Exception as e:
+            print(f"Error refreshing local vector cache: {e}")
+        query_cache.invalidate()
+
+
+def _allowed_sources(owner, company, category, year, gm: Optional[GraphManager] = None) -> list:
+    """Look up the sources matching the given filters in the knowledge graph, reusing recent lookups."""
+    cache_key = (owner, company, category, year)
+    cached = sources_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    sources = (gm or get_graph_manager()).query_documents(
+        owner=owner,
+        company=company,
+        category=category,
+        year=year,
+    )
+    sources_cache.put(cache_key, sources)
+    return sources
+
+
+def _small_filter_chunk_ids(sources: list, gm: Optional[GraphManager] = None) -> list:
+    """
+    Return the chunk IDs of the given sources if there are few enough to fetch directly.
+
+    Returns an empty list if any source has no recorded chunk IDs (e.g. it was
+    ingested before they were recorded) or the total exceeds SMALL_FILTER_MAX_CHUNKS.
+    """
+    cache_key = ("chunk_ids", *sorted(sources))
+    cached = sources_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    chunk_ids = []
+    if len(sources) <= SMALL_FILTER_MAX_CHUNKS:
+        recorded = (gm or get_graph_manager()).get_chunk_ids(sources)
+        for source in sources:
+            if not recorded.get(source):
+                chunk_ids = []
+                break
+            chunk_ids.extend(recorded[source])
+        if len(chunk_ids) > SMALL_FILTER_MAX_CHUNKS:
+            chunk_ids = []
+
+    sources_cache.put(cache_key, chunk_ids)
+    return chunk_ids
+
+
+class _Prefetcher:
+    """
+    Background thread that warms the graph lookups for filter combinations.
+
+    The UI submits filters as soon as they are selected, so the Neo4j round
+    trips happen while the user is still typing and the query finds them cached.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        threading.Thread(target=self._loop, name="filter-prefetch", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            owner, company, category, year, gm = self.queue.get()
+            try:
+                allowed_sources = _allowed_sources(owner, company, category, year, gm)
+                if allowed_sources:
+                    _small_filter_chunk_ids(allowed_sources, gm)
+            except Exception as e:
+                print(f"Error prefetching filters: {e}")
+
+
+@lru_cache(maxsize=1)
+def _get_prefetcher() -> _Prefetcher:
+    """Start the prefetch thread on the first prefetch request rather than at import."""
+    return _Prefetcher()
+
+
+def prefetch_filters(
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
+) -> None:
+    """Look up the sources for these filters in the background, ahead of the query that will use them."""
+    if any([owner, company, category, year]):
+        _get_prefetcher().queue.put((owner, company, category, year, gm))
+
 
 def retrieve_with_mmr(
     query: str,
     k: int = 20,
-    fetch_k: int = 100,
+    fetch_k: int = 60,
     owner: Optional[str] = None,
     company: Optional[str] = None,
     category: Optional[str] = None,
     year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
 ) -> list:
     """
     Retrieve documents using MMR for diversity, with optional graph-based filtering.
@@ -49,67 +500,187 @@ def retrieve_with_mmr(
         company: Filter to documents from this company
         category: Filter to documents in this category
         year: Filter to documents from this year
+        gm: Connected GraphManager to use for the filter lookup (defaults to the shared one)
     """
+    cache_key = ("mmr", _normalize_query(query), k, fetch_k, owner, company, category, year)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     # If filters are provided, get allowed sources from graph
     filter_dict = None
+    chunk_ids = None
     if any([owner, company, category, year]):
-        with GraphManager() as gm:
-            allowed_sources = gm.query_documents(
-                owner=owner,
-                company=company,
-                category=category,
-                year=year,
-            )
+        allowed_sources = _allowed_sources(owner, company, category, year, gm)
 
         if not allowed_sources:
             return []  # No documents match the filters
 
         # Pinecone filter: only search within allowed sources
         filter_dict = {"source": {"$in": allowed_sources}}
+        chunk_ids = _small_filter_chunk_ids(allowed_sources, gm)
 
     # Use MMR to get diverse results
-    docs = vectorstore.max_marginal_relevance_search(
-        query,
-        k=k,
-        fetch_k=fetch_k,
-        lambda_mult=MMR_LAMBDA,
-        filter=filter_dict,
-    )
+    embedding = embed_query(query)
+    docs = _search_mmr(query, embedding, k, fetch_k, filter_dict, chunk_ids)
+    query_cache.put(cache_key, docs)
+    return docs
+
 
+async def aretrieve_with_mmr(
+    query: str,
+    k: int = 20,
+    fetch_k: int = 60,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
+) -> list:
+    """Async version of retrieve_with_mmr; the blocking graph lookup and index query run in worker threads."""
+    cache_key = ("mmr", _normalize_query(query), k, fetch_k, owner, company, category, year)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    filter_dict = None
+    chunk_ids = None
+    if any([owner, company, category, year]):
+        allowed_sources = await asyncio.to_thread(_allowed_sources, owner, company, category, year, gm)
+
+        if not allowed_sources:
+            return []
+
+        filter_dict = {"source": {"$in": allowed_sources}}
+        chunk_ids = await asyncio.to_thread(_small_filter_chunk_ids, allowed_sources, gm)
+
+    embedding = await aembed_query(query)
+    docs = await asyncio.to_thread(_search_mmr, query, embedding, k, fetch_k, filter_dict, chunk_ids)
+    query_cache.put(cache_key, docs)
     return docs
 
 
+def retrieve_batch(
+    queries: list,
+    k: int = 20,
+    fetch_k: int = 60,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    gm: Optional[GraphManager] = None,
+) -> list:
+    """
+    Retrieve documents for several queries at once, returning one list per query.
+
+    Takes the same arguments as retrieve_with_mmr. The filter lookup runs once,
+    uncached queries are embedded in a single request, and their index queries
+    run concurrently.
+    """
+    cache_keys = [("mmr", _normalize_query(query), k, fetch_k, owner, company, category, year) for query in queries]
+    results = [query_cache.get(cache_key) for cache_key in cache_keys]
+    # One retrieval per distinct uncached query, even if it appears more than once
+    misses = {}
+    for cache_key, query, docs in zip(cache_keys, queries, results):
+        if docs is None:
+            misses.setdefault(cache_key, query)
+    if not misses:
+        return results
+
+    filter_dict = None
+    chunk_ids = None
+    if any([owner, company, category, year]):
+        allowed_sources = _allowed_sources(owner, company, category, year, gm)
+
+        if not allowed_sources:
+            return [[] for _ in queries]
+
+        filter_dict = {"source": {"$in": allowed_sources}}
+        chunk_ids = _small_filter_chunk_ids(allowed_sources, gm)
+
+    vectors = embed_queries(list(misses.values()))
+
+    def search(query, vector):
+        return _search_mmr(query, vector, k, fetch_k, filter_dict, chunk_ids)
+
+    with ThreadPoolExecutor(max_workers=min(len(vectors), RETRIEVAL_BATCH_CONCURRENCY)) as executor:
+        retrieved = dict(zip(misses, executor.map(search, misses.values(), vectors)))
+
+    for cache_key, docs in retrieved.items():
+        query_cache.put(cache_key, docs)
+    return [docs if docs is not None else list(retrieved[cache_key]) for docs, cache_key in zip(results, cache_keys)]
+
+
 def retrieve_with_score_filter(query: str, k: int = 100) -> list:
-    """Retrieve documents that meet the similarity score threshold."""
-    # Get documents with their similarity scores
-    docs_with_scores = vectorstore.similarity_search_with_score(query, k=k)
-
-    # Filter by score threshold (Pinecone: higher score = more similar)
-    filtered_docs = [
-        doc for doc, score in docs_with_scores
-        if score >= SCORE_THRESHOLD
-    ]
+    """
+    Retrieve up to k documents that meet the similarity score threshold.
 
+    Matches come back in descending score order, so the search starts small
+    and only widens while every match so far clears the threshold. Vectors
+    aren't needed and are left out of the response.
+    """
+    cache_key = ("score_filter", _normalize_query(query), k)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    embedding = embed_query(query)
+    top_k = min(SCORE_FILTER_INITIAL_K, k)
+    while True:
+        matches = vectorstore.index.query(
+            vector=embedding,
+            top_k=top_k,
+            include_values=False,
+            include_metadata=True,
+        )["matches"]
+
+        # Stop once a match falls below the threshold, the index runs out, or k is reached
+        if len(matches) < top_k or matches[-1]["score"] < SCORE_THRESHOLD or top_k >= k:
+            break
+        top_k = min(top_k * 2, k)
+
+    # One vectorized comparison; float64 keeps scores right at the threshold on the same side as before
+    keep = np.flatnonzero(np.asarray([match["score"] for match in matches], dtype=np.float64) >= SCORE_THRESHOLD)
+    filtered_docs = [_to_document(matches[i]) for i in keep]
+
+    query_cache.put(cache_key, filtered_docs)
     return filtered_docs
 
 
-# Keep the basic retriever for backward compatibility
-retriever = vectorstore.as_retriever(search_kwargs={"k": 100})
-
-prompt_template = ChatPromptTemplate.from_template(
-    """Answer the question based only on the following context:
+_PROMPT_STR = """Answer the question based only on the following context:
 
     {context}
 
     Question: {question}
 
     Provide a detailed answer:"""
-)
+
+# Kept for callers that import it; the chains below format _PROMPT_STR directly
+prompt_template = ChatPromptTemplate.from_template(_PROMPT_STR)
 
 
-def format_docs(docs):
-    """Format retrieved documents into a single string"""
-    return "\n\n ".join(doc.page_content for doc in docs)
+def _prompt_messages(inputs: dict) -> list:
+    """Fill the answer prompt, skipping the template machinery on the hot path."""
+    return [HumanMessage(content=_PROMPT_STR.format_map(inputs))]
+
+
+def format_docs(docs, max_tokens: int = CONTEXT_MAX_TOKENS):
+    """Format retrieved documents into a single string, keeping them in order until max_tokens is spent"""
+    buffer = io.StringIO()
+    remaining = max_tokens
+    for i, doc in enumerate(docs):
+        if remaining <= 0:
+            break
+        tokens = count_tokens(doc.page_content)
+        if i:
+            buffer.write("\n\n ")
+        if tokens > remaining:
+            # Trim the document that crosses the budget rather than drop it
+            buffer.write(trim_tokens(doc.page_content, remaining))
+            break
+        buffer.write(doc.page_content)
+        remaining -= tokens
+    return buffer.getvalue()
 
 
 def retrieval_without_lcel(query: str):
@@ -121,20 +692,68 @@ def retrieval_without_lcel(query: str):
 
     context = format_docs(docs)
 
-    messages = prompt_template.format_messages(context=context, question=query)
+    messages = _prompt_messages({"context": context, "question": query})
 
     response = llm.invoke(messages)
 
     return response.content
 
-@tool
-def search_documents(query: str) -> str:
-    """Search the knowledge base for relevant information to answer a user's question.
+@lru_cache(maxsize=1)
+def _search_shards() -> list:
+    """Parse SEARCH_SHARDS once, raising a ValueError that names the variable if it is malformed."""
+    try:
+        shards = json.loads(SEARCH_SHARDS)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"SEARCH_SHARDS is not valid JSON ({e}): {SEARCH_SHARDS!r}") from e
+    if not isinstance(shards, list) or not shards or not all(isinstance(shard, dict) for shard in shards):
+        raise ValueError(f"SEARCH_SHARDS must be a non-empty JSON list of filter objects: {SEARCH_SHARDS!r}")
+    return shards
 
-    Args:
-        query: The search query to find relevant documents
+
+@lru_cache(maxsize=1)
+def _get_shard_executor() -> ThreadPoolExecutor:
+    """Build the shard search pool on the first sharded search."""
+    return ThreadPoolExecutor(max_workers=RETRIEVAL_BATCH_CONCURRENCY, thread_name_prefix="retrieval-shard")
+
+
+def retrieve_sharded(query: str, shards: list, k: int = 20, fetch_k: int = 60) -> list:
     """
-    docs = retrieve_with_mmr(query, k=20, fetch_k=100)
+    Run retrieve_with_mmr once per filter shard in parallel and merge the results.
+
+    Shards are keyword dicts of filters (an empty dict searches everything).
+    Results are interleaved by rank so each shard's best documents come
+    first, chunks found by more than one shard are kept only at their best
+    rank, and the merged list is cut to k.
+    """
+    if len(shards) == 1:
+        return retrieve_with_mmr(query, k=k, fetch_k=fetch_k, **shards[0])
+
+    executor = _get_shard_executor()
+    futures = [executor.submit(retrieve_with_mmr, query, k=k, fetch_k=fetch_k, **shard) for shard in shards]
+    ranked = [future.result() for future in futures]
+
+    merged = []
+    seen = set()
+    for rank in range(max(map(len, ranked), default=0)):
+        for docs in ranked:
+            if rank >= len(docs):
+                continue
+            doc = docs[rank]
+            key = doc.id or (doc.metadata.get("source"), doc.page_content)
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+    return merged[:k]
+
+
+class _SearchArgs(BaseModel):
+    query: str = Field(..., description="The search query to find relevant documents")
+
+
+@tool("search_documents", args_schema=_SearchArgs, return_direct=False)
+def search_documents(query: str) -> str:
+    """Search the knowledge base for relevant information to answer a user's question."""
+    docs = retrieve_sharded(query, _search_shards())
     if not docs:
         return "No relevant documents found."
     return "\n\n".join(
@@ -158,65 +777,63 @@ def retrieval_with_lcel(
         category: Filter to documents in this category
         year: Filter to documents from this year
     """
-    # Use MMR retrieval with graph filters
+    # Use MMR retrieval with graph filters; the async version serves ainvoke/abatch
     mmr_retriever = RunnableLambda(
         lambda q: retrieve_with_mmr(
-            q, k=20, fetch_k=100,
-            owner=owner, company=company, category=category, year=year
-        )
+            q, owner=owner, company=company, category=category, year=year
+        ),
+        afunc=lambda q: aretrieve_with_mmr(
+            q, owner=owner, company=company, category=category, year=year
+        ),
     )
 
     retrieval_chain = (
             RunnablePassthrough.assign(
                 context=itemgetter("question") | mmr_retriever | format_docs
             )
-            | prompt_template
+            | RunnableLambda(_prompt_messages)
             | llm
             | StrOutputParser()
     )
     return retrieval_chain
 
 
-if __name__ == "__main__":
-    print("Retrieving documents...")
-
-    # =====================================================
-    # Example 1: Unfiltered query (searches all documents)
-    # =====================================================
-    print("\n" + "=" * 70)
-    print("Example 1: Unfiltered search")
-    print("=" * 70)
-
-    query = "What is the PAN number?"
-    chain = retrieval_with_lcel()
-    result = chain.invoke({"question": query})
-    print(f"\nQuery: {query}")
-    print(f"Answer: {result}")
-
-    # =====================================================
-    # Example 2: Filtered to personal documents only
-    # =====================================================
-    print("\n" + "=" * 70)
-    print("Example 2: Filtered to Ved Muthal's documents only")
-    print("=" * 70)
-
-    query = "What personal information do you have?"
-    chain = retrieval_with_lcel(owner="Ved Muthal")
-    result = chain.invoke({"question": query})
-    print(f"\nQuery: {query}")
-    print(f"Filter: owner='Ved Muthal'")
-    print(f"Answer: {result}")
-
-    # =====================================================
-    # Example 3: Filtered to SBI documents from 2024
-    # =====================================================
-    print("\n" + "=" * 70)
-    print("Example 3: Filtered to SBI 2024 documents")
-    print("=" * 70)
-
-    query = "What was the net profit?"
-    chain = retrieval_with_lcel(company="State Bank of India", year=2024)
-    result = chain.invoke({"question": query})
-    print(f"\nQuery: {query}")
-    print(f"Filter: company='State Bank of India', year=2024")
-    print(f"Answer: {result}")
\ No newline at end of file
+async def arun_many(
+    questions: list,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+    max_concurrency: int = 16,
+) -> list:
+    """Answer several questions concurrently with the LCEL retrieval chain, returning answers in order."""
+    chain = retrieval_with_lcel(owner=owner, company=company, category=category, year=year)
+    return await chain.abatch(
+        [{"question": question} for question in questions],
+        config={"max_concurrency": max_concurrency},
+    )
+
+
+def retrieval_stream(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+):
+    """Answer a question with the LCEL retrieval chain, yielding the answer as it is generated."""
+    chain = retrieval_with_lcel(owner=owner, company=company, category=category, year=year)
+    yield from chain.stream({"question": query})
+
+
+async def aretrieval_stream(
+    query: str,
+    owner: Optional[str] = None,
+    company: Optional[str] = None,
+    category: Optional[str] = None,
+    year: Optional[int] = None,
+):
+    """Async version of retrieval_stream."""
+    chain = retrieval_with_lcel(owner=owner, company=company, category=category, year=year)
+    async for chunk in chain.astream({"question": query}):
+        yield chunk
@@ -0,0 +1,69 @@
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import token_utils
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class _ByteEncoding:
+    """One token per UTF-8 byte, so budgets are exact without downloading a tiktoken encoding."""
+
+    def encode(self, text, disallowed_special=()):
+        return list(text.encode("utf-8"))
+
+    def decode(self, ids):
+        return bytes(ids).decode("utf-8", errors="ignore")
+
+
+@pytest.fixture
+def byte_tokens(monkeypatch):
+    monkeypatch.setattr(token_utils, "get_encoding", lambda: _ByteEncoding())
+
+
+class _FakeEmbeddings(DeterministicFakeEmbedding):
+    model: str = "fake"
+
+
+class _FakeVectorStore:
+    def __init__(self, **kwargs):
+        self.index = None
+        self._namespace = None
+
+
+@pytest.fixture(scope="module")
+def retrieval(tmp_path_factory):
+    """
+    retrieval.py loaded without network clients.
+
+    The OpenAI, Pinecone and Neo4j clients it builds at import are replaced
+    with offline fakes, so only its local helpers are usable.
+    """
+    clients = types.ModuleType("clients")
+    clients.get_openai_embeddings = lambda *args, **kwargs: _FakeEmbeddings(size=8)
+    clients.get_chat_openai = lambda *args, **kwargs: None
+    clients.get_pinecone_index = lambda name: None
+
+    graph_manager = types.ModuleType("graph_manager")
+    graph_manager.GraphManager = object
+    graph_manager.get_graph_manager = lambda: None
+
+    langchain_pinecone = types.ModuleType("langchain_pinecone")
+    langchain_pinecone.PineconeVectorStore = _FakeVectorStore
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("EMBEDDING_CACHE_DIR", str(tmp_path_factory.mktemp("embeddings")))
+        mp.setenv("LOCAL_VECTOR_CACHE", "0")
+        mp.setitem(sys.modules, "clients", clients)
+        mp.setitem(sys.modules, "graph_manager", graph_manager)
+        mp.setitem(sys.modules, "langchain_pinecone", langchain_pinecone)
+
+        spec = importlib.util.spec_from_file_location("_retrieval_under_test", REPO_ROOT / "retrieval.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
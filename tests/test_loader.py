@@ -0,0 +1,116 @@
+import shelve
+
+import openpyxl
+import pytest
+
+import MultiFormatLoader as mfl
+from MultiFormatLoader import MultiFormatLoader, _parse_xml, _xlsx_sheet_summaries, is_quality_text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("The quarterly revenue grew by ten percent compared to last year.", True),
+        ("Logo", False),
+        ("$$$ 123 456 789 ### %%% 000 111 222 333 444 555 666 777 888 999", False),
+        ("Supercalifragilisticexpialidociousandevenlongerwordwithoutspaces", False),
+        ("", False),
+    ],
+)
+def test_is_quality_text(text, expected) -> None:
+    assert is_quality_text(text) is expected
+
+
+def test_is_quality_text_non_ascii_matches_ascii_path() -> None:
+    ascii_text = "Die Umsatzerloese stiegen im Vergleich zum Vorjahr deutlich an."
+    unicode_text = "Die Umsatzerlöse stiegen im Vergleich zum Vorjahr deutlich an."
+
+    assert is_quality_text(ascii_text) and is_quality_text(unicode_text)
+
+
+def test_parse_xml(tmp_path) -> None:
+    path = tmp_path / "filing.xml"
+    path.write_text(
+        '<filing year="2024">'
+        "<company>Acme</company>"
+        "<item><name>Revenue</name></item>"
+        "<item><name>Costs</name></item>"
+        "</filing>"
+    )
+
+    root_tag, root_dict, num_children = _parse_xml(str(path))
+
+    assert root_tag == "filing"
+    assert num_children == 3
+    assert root_dict == {
+        "@attributes": {"year": "2024"},
+        "company": {"text": "Acme"},
+        "item": [{"name": {"text": "Revenue"}}, {"name": {"text": "Costs"}}],
+    }
+
+
+def test_xlsx_sheet_summaries(tmp_path) -> None:
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sales"
+    sheet.append(["Region", None, "Total"])
+    sheet.append(["North", 1, 10])
+    sheet.append(["South", 2, 20])
+    workbook.create_sheet("Empty")
+    workbook.save(path)
+
+    summaries = _xlsx_sheet_summaries(str(path), path.stat().st_mtime_ns)
+
+    assert summaries == (
+        ("Sales", 2, ("Region", "Unnamed: 1", "Total")),
+        ("Empty", 0, ()),
+    )
+
+
+def _documents_dir(tmp_path):
+    documents = tmp_path / "documents"
+    documents.mkdir()
+    (documents / "good.txt").write_text("some text", encoding="utf-8")
+    (documents / "stale.txt").write_text("going away", encoding="utf-8")
+    (documents / "broken.xml").write_text("<root><open>", encoding="utf-8")
+    return documents
+
+
+def test_load_all_caches_only_clean_loads_and_prunes(tmp_path) -> None:
+    documents = _documents_dir(tmp_path)
+    cache_path = str(tmp_path / "cache" / "documents")
+
+    loader = MultiFormatLoader(str(documents), max_workers=1, cache_path=cache_path)
+    loader.load_all()
+
+    assert loader.failed_files == [str(documents / "broken.xml")]
+    with shelve.open(cache_path) as cache:
+        assert sorted(cache.keys()) == [str(documents / "good.txt"), str(documents / "stale.txt")]
+
+    (documents / "stale.txt").unlink()
+    MultiFormatLoader(str(documents), max_workers=1, cache_path=cache_path).load_all()
+
+    with shelve.open(cache_path) as cache:
+        assert list(cache.keys()) == [str(documents / "good.txt")]
+
+
+def test_load_all_keeps_default_cache_out_of_documents(tmp_path, monkeypatch) -> None:
+    documents = _documents_dir(tmp_path)
+    monkeypatch.setattr(mfl, "LOADER_CACHE_DIR", str(tmp_path / "cache"))
+
+    loader = MultiFormatLoader(str(documents), max_workers=1)
+    loader.load_all()
+
+    assert loader.cache_path.startswith(str(tmp_path / "cache"))
+    assert loader.cache_path == MultiFormatLoader(str(documents) + "/").cache_path
+    assert sorted(path.name for path in documents.iterdir()) == ["broken.xml", "good.txt", "stale.txt"]
+
+
+def test_load_all_without_writable_cache(tmp_path) -> None:
+    documents = _documents_dir(tmp_path)
+    (tmp_path / "not_a_dir").write_text("", encoding="utf-8")
+
+    loader = MultiFormatLoader(str(documents), max_workers=1, cache_path=str(tmp_path / "not_a_dir" / "cache"))
+
+    assert len(loader.load_all()) == 2
@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+
+def test_query_cache_returns_copies(retrieval) -> None:
+    cache = retrieval.QueryCache()
+    cache.put(("q",), ["a", "b"])
+
+    hit = cache.get(("q",))
+    hit.append("c")
+
+    assert cache.get(("q",)) == ["a", "b"]
+    assert cache.get(("other",)) is None
+
+
+def test_query_cache_expires_entries(retrieval, monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr(retrieval.time, "monotonic", lambda: now[0])
+    cache = retrieval.QueryCache(ttl=10)
+
+    cache.put(("q",), ["a"])
+    now[0] += 9
+    assert cache.get(("q",)) == ["a"]
+    now[0] += 1
+    assert cache.get(("q",)) is None
+
+
+def test_query_cache_evicts_least_recently_used(retrieval) -> None:
+    cache = retrieval.QueryCache(max_size=2)
+    cache.put(("a",), [1])
+    cache.put(("b",), [2])
+    cache.get(("a",))
+    cache.put(("c",), [3])
+
+    assert cache.get(("a",)) == [1]
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) == [3]
+
+
+def test_query_cache_invalidate(retrieval) -> None:
+    cache = retrieval.QueryCache()
+    cache.put(("q",), ["a"])
+    cache.invalidate()
+
+    assert cache.get(("q",)) is None
+
+
+class _CountingIndex:
+    def __init__(self):
+        self.queries = 0
+
+    def query(self, vector, top_k, include_values, include_metadata, filter=None):
+        self.queries += 1
+        return {"matches": [
+            {"id": str(i), "score": 0.9 - i / 100, "values": [float(i == j) for j in range(8)],
+             "metadata": {"text": f"chunk {i}", "source": "report.pdf"}}
+            for i in range(min(top_k, 8))
+        ]}
+
+
+def test_retrieve_with_mmr_serves_repeated_queries_from_cache(retrieval, monkeypatch) -> None:
+    index = _CountingIndex()
+    monkeypatch.setattr(retrieval.vectorstore, "index", index)
+    retrieval.query_cache.invalidate()
+
+    first = retrieval.retrieve_with_mmr("What was revenue?", k=3, fetch_k=8)
+    second = retrieval.retrieve_with_mmr("  what was   REVENUE? ", k=3, fetch_k=8)
+
+    assert index.queries == 1
+    assert [doc.id for doc in second] == [doc.id for doc in first]
+
+    retrieval.retrieve_with_mmr("What was revenue?", k=4, fetch_k=8)
+    assert index.queries == 2
+    retrieval.query_cache.invalidate()
+
+
+@pytest.mark.parametrize("lambda_mult", [0.3, 0.5, 0.9])
+def test_mmr_simsimd_matches_langchain_float_mmr(retrieval, lambda_mult) -> None:
+    rng = np.random.default_rng(42)
+    query_vec = rng.standard_normal(64).astype(np.float32)
+    cand_vecs = rng.standard_normal((40, 64)).astype(np.float32)
+
+    selected = retrieval.mmr_simsimd(query_vec, cand_vecs, k=10, lambda_mult=lambda_mult)
+    expected = maximal_marginal_relevance(query_vec, cand_vecs, lambda_mult=lambda_mult, k=10)
+
+    assert selected == expected
+
+
+def test_mmr_simsimd_caps_k(retrieval) -> None:
+    vectors = np.eye(3, dtype=np.float32)
+
+    assert sorted(retrieval.mmr_simsimd(vectors[0], vectors, k=10)) == [0, 1, 2]
+    assert retrieval.mmr_simsimd(vectors[0], vectors, k=0) == []
+
+
+def test_quantize_int8_preserves_direction(retrieval) -> None:
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((20, 64)).astype(np.float32)
+    vectors[3] = 0
+
+    quantized = retrieval.quantize_int8(vectors)
+
+    assert quantized.dtype == np.int8
+    assert np.abs(quantized).max() == 127
+    assert not quantized[3].any()
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(quantized, axis=1)
+    cosine = np.sum(vectors * quantized, axis=1)[norms > 0] / norms[norms > 0]
+    assert cosine.min() > 0.999
+
+
+def test_int8_mmr_selects_like_float_mmr(retrieval) -> None:
+    rng = np.random.default_rng(3)
+    query_vec = rng.standard_normal(256).astype(np.float32)
+    cand_vecs = rng.standard_normal((30, 256)).astype(np.float32)
+    # Spread relevance out so selection doesn't hinge on quantization noise
+    cand_vecs += np.linspace(0, 2, 30, dtype=np.float32)[:, None] * query_vec
+
+    float_selected = retrieval.mmr_simsimd(query_vec, cand_vecs, k=5)
+    int8_selected = retrieval.mmr_simsimd(retrieval.quantize_int8(query_vec), retrieval.quantize_int8(cand_vecs), k=5)
+
+    assert int8_selected == float_selected
+
+
+def test_format_docs_trims_document_crossing_budget(retrieval, byte_tokens) -> None:
+    docs = [Document(page_content="a" * 10), Document(page_content="b" * 10), Document(page_content="c" * 10)]
+
+    assert retrieval.format_docs(docs, max_tokens=15) == "a" * 10 + "\n\n " + "b" * 5
+
+
+def test_format_docs_keeps_order_within_budget(retrieval, byte_tokens) -> None:
+    docs = [Document(page_content="first"), Document(page_content="second")]
+
+    assert retrieval.format_docs(docs, max_tokens=100) == "first\n\n second"
+
+
+def test_retrieve_sharded_interleaves_and_dedupes(retrieval, monkeypatch) -> None:
+    results = {
+        "a": [Document(id="a1", page_content="a1"), Document(id="shared", page_content="s"), Document(id="a3", page_content="a3")],
+        "b": [Document(id="shared", page_content="s"), Document(id="b2", page_content="b2")],
+    }
+    monkeypatch.setattr(retrieval, "retrieve_with_mmr", lambda query, k, fetch_k, owner: results[owner])
+
+    merged = retrieval.retrieve_sharded("q", [{"owner": "a"}, {"owner": "b"}], k=4)
+
+    assert [doc.id for doc in merged] == ["a1", "shared", "b2", "a3"]
+    assert [doc.id for doc in retrieval.retrieve_sharded("q", [{"owner": "a"}, {"owner": "b"}], k=2)] == ["a1", "shared"]
+
+
+def test_retrieve_sharded_single_shard_skips_pool(retrieval, monkeypatch) -> None:
+    docs = [Document(id="only", page_content="x")]
+    monkeypatch.setattr(retrieval, "retrieve_with_mmr", lambda query, k, fetch_k: docs)
+
+    assert retrieval.retrieve_sharded("q", [{}]) == docs
+
+
+def test_search_shards_rejects_malformed_value(retrieval, monkeypatch) -> None:
+    monkeypatch.setattr(retrieval, "SEARCH_SHARDS", "[{owner: x}]")
+    retrieval._search_shards.cache_clear()
+    try:
+        with pytest.raises(ValueError, match="SEARCH_SHARDS"):
+            retrieval._search_shards()
+    finally:
+        retrieval._search_shards.cache_clear()
+
+
+
+
+
+def test_embed_queries_batch_larger_than_lru(retrieval, monkeypatch) -> None:
+    monkeypatch.setattr(retrieval, "_query_vectors", OrderedDict())
+    monkeypatch.setattr(retrieval, "QUERY_EMBEDDING_LRU_SIZE", 2)
+    queries = [f"query {i}" for i in range(5)] + ["query 0"]
+
+    vectors = retrieval.embed_queries(queries)
+
+    assert len(vectors) == 6
+    assert vectors[0] == vectors[5] == retrieval.embeddings.embed_query("query 0")
+    assert len(retrieval._query_vectors) == 2
+
+
+def test_embed_query_lru_is_thread_safe(retrieval, monkeypatch) -> None:
+    monkeypatch.setattr(retrieval, "_query_vectors", OrderedDict())
+    monkeypatch.setattr(retrieval, "QUERY_EMBEDDING_LRU_SIZE", 4)
+    queries = [f"query {i % 12}" for i in range(600)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        vectors = list(executor.map(retrieval.embed_query, queries))
+
+    assert vectors[:12] == vectors[12:24]
+
+
+class _RecordingEmbeddings:
+    def __init__(self):
+        self.texts = []
+
+    def embed_query(self, text):
+        self.texts.append(text)
+        return [1.0]
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return [[1.0] for _ in texts]
+
+
+def test_embeds_original_text_and_caches_by_normalized_key(retrieval, monkeypatch) -> None:
+    recorder = _RecordingEmbeddings()
+    monkeypatch.setattr(retrieval, "embeddings", recorder)
+    monkeypatch.setattr(retrieval, "_query_vectors", OrderedDict())
+
+    retrieval.embed_query("AAPL  revenue")
+    retrieval.embed_query("aapl revenue")
+    retrieval.embed_queries(["GSTIN of Acme", "gstin of acme", "PAN"])
+
+    assert recorder.texts == ["AAPL  revenue", "GSTIN of Acme", "PAN"]
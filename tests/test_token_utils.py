@@ -0,0 +1,44 @@
+from langchain_core.documents import Document
+
+from token_utils import count_tokens, pack_documents, trim_tokens
+
+
+def test_trim_tokens_keeps_short_text(byte_tokens) -> None:
+    assert trim_tokens("short", 10) == "short"
+
+
+def test_trim_tokens_cuts_to_budget(byte_tokens) -> None:
+    trimmed = trim_tokens("a" * 100, 30)
+    assert trimmed == "a" * 30
+    assert count_tokens(trimmed) == 30
+
+
+def test_pack_documents_ranks_by_relevance_and_trims_last(byte_tokens) -> None:
+    documents = [
+        Document(page_content="b" * 40, metadata={"relevance_score": 0.5}),
+        Document(page_content="a" * 40, metadata={"relevance_score": 0.9}),
+        Document(page_content="c" * 40, metadata={"relevance_score": 0.1}),
+    ]
+
+    packed = pack_documents(documents, max_tokens=60)
+
+    assert [document.page_content for document in packed] == ["a" * 40, "b" * 20]
+    assert sum(count_tokens(document.page_content) for document in packed) == 60
+    assert packed[1].metadata == {"relevance_score": 0.5}
+
+
+def test_pack_documents_puts_unscored_first(byte_tokens) -> None:
+    documents = [
+        Document(page_content="scored", metadata={"relevance_score": 0.99}),
+        Document(page_content="web", metadata={"source": "https://example.com"}),
+    ]
+
+    packed = pack_documents(documents, max_tokens=100)
+
+    assert [document.page_content for document in packed] == ["web", "scored"]
+
+
+def test_pack_documents_stops_at_exact_budget(byte_tokens) -> None:
+    documents = [Document(page_content="x" * 10, metadata={"relevance_score": 1.0 - i / 10}) for i in range(5)]
+
+    assert len(pack_documents(documents, max_tokens=20)) == 2
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from vector_cache import LocalVectorCache
+
+
+class _FakeIndex:
+    def __init__(self, vectors: dict):
+        self.vectors = vectors
+
+    def list(self, namespace=None):
+        yield list(self.vectors)
+
+    def fetch(self, ids, namespace=None):
+        return SimpleNamespace(vectors={
+            i: SimpleNamespace(id=i, values=self.vectors[i][0], metadata={"source": self.vectors[i][1]}) for i in ids
+        })
+
+
+def _cache(tmp_path, n=50):
+    rng = np.random.default_rng(0)
+    vectors = {f"chunk-{i}": (rng.standard_normal(16).tolist(), f"doc-{i % 5}.pdf") for i in range(n)}
+    cache = LocalVectorCache(_FakeIndex(vectors), str(tmp_path))
+    assert cache.load()
+    return cache, vectors, rng.standard_normal(16)
+
+
+def test_candidates_rank_by_cosine(tmp_path) -> None:
+    cache, vectors, query = _cache(tmp_path)
+
+    matches = cache.candidates(query, fetch_k=5)
+
+    expected = sorted(
+        vectors, key=lambda i: -np.dot(vectors[i][0], query) / np.linalg.norm(vectors[i][0])
+    )[:5]
+    assert [match["id"] for match in matches] == expected
+    assert all(a["score"] >= b["score"] for a, b in zip(matches, matches[1:]))
+
+
+def test_candidates_filter_by_source(tmp_path) -> None:
+    cache, vectors, query = _cache(tmp_path)
+
+    matches = cache.candidates(query, fetch_k=100, sources=["doc-1.pdf", "doc-3.pdf", "missing.pdf"])
+
+    assert {match["metadata"]["source"] for match in matches} == {"doc-1.pdf", "doc-3.pdf"}
+    assert len(matches) == 20
+    assert cache.candidates(query, fetch_k=10, sources=["missing.pdf"]) == []
+
+
+def test_reload_from_disk_keeps_source_codes(tmp_path) -> None:
+    cache, _, query = _cache(tmp_path)
+    reloaded = LocalVectorCache(None, str(tmp_path))
+
+    assert reloaded.load()
+    reloaded_ids = [match["id"] for match in reloaded.candidates(query, fetch_k=100, sources=["doc-2.pdf"])]
+    assert reloaded_ids
+    assert reloaded_ids == [match["id"] for match in cache.candidates(query, fetch_k=100, sources=["doc-2.pdf"])]
@@ -0,0 +1,63 @@
+"""
+Token budgeting helpers for prompts.
+
+Claude's tokenizer isn't public, so counts use tiktoken's cl100k_base as a
+close approximation; budgets should leave some headroom for the difference.
+"""
+
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+from langchain_core.documents import Document
+
+
+@lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def trim_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    # Every token covers at least one character, so short text can't be over budget
+    if len(text) <= max_tokens:
+        return text
+
+    encoding = get_encoding()
+    ids = encoding.encode(text, disallowed_special=())
+    if len(ids) <= max_tokens:
+        return text
+    return encoding.decode(ids[:max_tokens])
+
+
+def pack_documents(documents: List[Document], max_tokens: int) -> List[Document]:
+    """
+    Greedily keep documents, most relevant first, until max_tokens is spent.
+
+    Documents are ranked by metadata["relevance_score"]; those without one
+    (e.g. web results fetched because retrieval fell short) rank first. The
+    document that crosses the budget is trimmed to fit and packing stops.
+    """
+    ranked = sorted(documents, key=lambda d: -d.metadata.get("relevance_score", float("inf")))
+
+    packed = []
+    remaining = max_tokens
+    for document in ranked:
+        if remaining <= 0:
+            break
+
+        tokens = count_tokens(document.page_content)
+        if tokens <= remaining:
+            packed.append(document)
+            remaining -= tokens
+        else:
+            packed.append(Document(
+                page_content=trim_tokens(document.page_content, remaining),
+                metadata=document.metadata,
+            ))
+            break
+    return packed
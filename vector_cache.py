@@ -0,0 +1,113 @@
+"""
+Local copy of the Pinecone index for serving retrieval without a network round trip.
+
+The corpus is small (thousands of chunks), so the whole index fits on disk
+as one float32 matrix. It is memory-mapped rather than loaded, and one
+matrix-vector product scores every chunk against a query.
+"""
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+VECTORS_FILE = "vectors.f32.bin"
+META_FILE = "meta.json"
+
+# IDs per Pinecone fetch request while downloading the index
+DOWNLOAD_BATCH_SIZE = 100
+
+
+class LocalVectorCache:
+    """
+    Unit-normalized chunk vectors in a memory-mapped file, with their IDs and metadata.
+
+    Vectors are normalized on download, so a dot product with a normalized
+    query is its cosine similarity, the same score Pinecone reports.
+    """
+
+    def __init__(self, index, path: str, namespace: Optional[str] = None):
+        self.index = index
+        self.path = path
+        self.namespace = namespace
+        # (vectors, ids, metadata, source_codes, source_index), swapped as a whole so a refresh
+        # never mixes two versions. Each row's source is stored as an int code, and source_index
+        # maps a source name to its code, so filtering by source compares ints, not strings.
+        self._state = None
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    def load(self) -> bool:
+        """Map the cached index from disk, downloading it first if there is none. Returns whether it is ready."""
+        try:
+            if not os.path.exists(os.path.join(self.path, META_FILE)):
+                self.refresh()
+                return self.ready
+
+            with open(os.path.join(self.path, META_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.memmap(
+                os.path.join(self.path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(len(meta["ids"]), meta["dim"])
+            )
+            source_names, source_codes = np.unique([m.get("source", "") for m in meta["metadata"]], return_inverse=True)
+            source_index = {name: code for code, name in enumerate(source_names.tolist())}
+            self._state = (vectors, meta["ids"], meta["metadata"], source_codes.reshape(-1), source_index)
+        except Exception as e:
+            print(f"Error loading local vector cache: {e}")
+        return self.ready
+
+    def refresh(self) -> None:
+        """Download every vector in the index and replace the cached copy, e.g. after re-ingesting documents."""
+        ids, rows, metadata = [], [], []
+        for page in self.index.list(namespace=self.namespace):
+            for start in range(0, len(page), DOWNLOAD_BATCH_SIZE):
+                response = self.index.fetch(ids=page[start:start + DOWNLOAD_BATCH_SIZE], namespace=self.namespace)
+                for vector in response.vectors.values():
+                    ids.append(vector.id)
+                    rows.append(vector.values)
+                    metadata.append(vector.metadata or {})
+
+        if not rows:
+            print("Local vector cache not refreshed: the index listed no vectors")
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        vectors = np.asarray(rows, dtype=np.float32).reshape(len(rows), -1)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        # Written under temporary names and swapped in, so a reader never maps a half-written file
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        meta_path = os.path.join(self.path, META_FILE)
+        vectors.tofile(vectors_path + ".tmp")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dim": vectors.shape[1], "ids": ids, "metadata": metadata}, f)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+        self.load()
+
+    def candidates(self, embedding, fetch_k: int, sources: Optional[list] = None) -> list:
+        """
+        Return the fetch_k chunks most similar to the query as Pinecone-style matches.
+
+        If sources is given, only chunks from those sources are considered,
+        like a {"source": {"$in": sources}} filter on the index.
+        """
+        vectors, ids, metadata, source_codes, source_index = self._state
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) or 1.0)
+        scores = vectors @ query_vec
+
+        if sources is not None:
+            wanted = np.fromiter((source_index[s] for s in set(sources) if s in source_index), dtype=source_codes.dtype)
+            rows = np.flatnonzero(np.isin(source_codes, wanted))
+        else:
+            rows = np.arange(len(scores))
+        if len(rows) > fetch_k:
+            rows = rows[np.argpartition(-scores[rows], fetch_k)[:fetch_k]]
+        rows = rows[np.argsort(-scores[rows])]
+
+        return [{"id": ids[i], "score": float(scores[i]), "values": vectors[i], "metadata": metadata[i]} for i in rows]